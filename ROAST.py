@@ -1,23 +1,42 @@
+import bisect
+import functools
 import logging
 import math
 import string
+from collections import OrderedDict
+from pathlib import Path
 from typing import List, Tuple, Dict, Any, Optional
-from haystack import component, Document, Answer
+import torch
+from haystack import component, Document, Answer, ExtractedAnswer
 from haystack.components.readers import ExtractiveReader
 
+from result_cache import ReaderAnswerCache, checkpoint_identity
+
 
 @component
 class QuestionGenerator:
     """
     Generates a set of varied, natural-language questions to guide the
     ExtractiveReader, improving its ability to find diverse instances.
+    Questions are memoized per concept in a bounded LRU cache, since the concept vocabulary is small.
     """
 
+    def __init__(self, cache_size: int = 1024):
+        self.cache_size = cache_size
+        self._cached_questions = functools.lru_cache(maxsize=cache_size)(self._build_questions)
+
+    def cache_stats(self) -> Dict[str, int]:
+        info = self._cached_questions.cache_info()
+        return {"hits": info.hits, "misses": info.misses, "entries": info.currsize}
+
     @component.output_types(questions=List[str])
     def run(self, abstract_concept: str) -> Dict[str, Any]:
         if not isinstance(abstract_concept, str) or not abstract_concept:
             return {"questions": []}
+        return {"questions": list(self._cached_questions(abstract_concept))}
 
+    @staticmethod
+    def _build_questions(abstract_concept: str) -> Tuple[str, ...]:
         if abstract_concept.endswith('y') and len(abstract_concept) > 1 and abstract_concept[-2] not in "aeiou":
             plural_concept = f"{abstract_concept[:-1]}ies"
         elif abstract_concept.endswith(('s', 'x', 'z', 'ch', 'sh')):
@@ -25,13 +44,53 @@ class QuestionGenerator:
         else:
             plural_concept = f"{abstract_concept}s"
 
-        questions = [
+        return (
             f"What are the instances of {abstract_concept} mentioned in the text?",
             f"Which {plural_concept} are described in the passage?",
             f"What specific {plural_concept} are listed in the document?",
             f"Identify the names of the {plural_concept} in the text.",
-        ]
-        return {"questions": questions}
+        )
+
+class _ContainmentIndex:
+    """
+    Spans kept by AnswerFilter, indexed by their start position among a fixed set of possible starts.
+    A prefix-max Fenwick tree over ends answers "does a kept span start at or before s and end at or after e"
+    (it contains the candidate), and a prefix-min tree over the reversed starts answers "does a kept span start
+    at or after s and end at or before e" (the candidate contains it). Insertions and queries are O(log n).
+    """
+
+    def __init__(self, starts: List[Any]):
+        self._starts = sorted(set(starts))
+        self._size = len(self._starts)
+        self._max_end = [-math.inf] * (self._size + 1)
+        self._min_end = [math.inf] * (self._size + 1)
+
+    def _positions(self, start) -> Tuple[int, int]:
+        """1-based positions of `start` in the forward and in the reversed Fenwick tree."""
+        rank = bisect.bisect_left(self._starts, start)
+        return rank + 1, self._size - rank
+
+    def add(self, start, end) -> None:
+        forward, backward = self._positions(start)
+        while forward <= self._size:
+            self._max_end[forward] = max(self._max_end[forward], end)
+            forward += forward & -forward
+        while backward <= self._size:
+            self._min_end[backward] = min(self._min_end[backward], end)
+            backward += backward & -backward
+
+    def overlaps(self, start, end) -> bool:
+        """True if a kept span contains [start, end] or lies within it (same test as AnswerFilter._is_overlapping)."""
+        forward, backward = self._positions(start)
+        max_end, min_end = -math.inf, math.inf
+        while forward > 0:
+            max_end = max(max_end, self._max_end[forward])
+            forward -= forward & -forward
+        while backward > 0:
+            min_end = min(min_end, self._min_end[backward])
+            backward -= backward & -backward
+        return max_end >= end or min_end <= end
+
 
 @component
 class AnswerFilter:
@@ -48,6 +107,12 @@ class AnswerFilter:
         start2, end2 = answer2.meta['start'], answer2.meta['end']
         return (start1 >= start2 and end1 <= end2) or (start2 >= start1 and end2 <= end1)
 
+    @staticmethod
+    def _span(answer: Answer) -> Optional[Tuple[Any, Any]]:
+        if hasattr(answer, 'meta') and 'start' in answer.meta and 'end' in answer.meta:
+            return answer.meta['start'], answer.meta['end']
+        return None
+
     @component.output_types(filtered_answers=List[Answer])
     def run(self, answers: List[Answer]) -> Dict[str, Any]:
         for ans in answers:
@@ -56,14 +121,225 @@ class AnswerFilter:
             else:
                 ans.meta['normalized_score'] = 0
         sorted_answers = sorted(answers, key=lambda ans: ans.meta.get('normalized_score', 0), reverse=True)
+        # Answers without a span never overlap anything, so only spanned answers go into the index.
+        # This keeps exactly the answers the pairwise _is_overlapping check keeps, in O(n log n).
+        spans = [self._span(ans) for ans in sorted_answers]
+        kept_spans = _ContainmentIndex([span[0] for span in spans if span is not None])
         final_answers: List[Answer] = []
-        for candidate_answer in sorted_answers:
+        for candidate_answer, span in zip(sorted_answers, spans):
             if candidate_answer.data is None:
                 continue
-            if not any(self._is_overlapping(candidate_answer, kept_answer) for kept_answer in final_answers):
+            if span is None:
                 final_answers.append(candidate_answer)
+            elif not kept_spans.overlaps(*span):
+                final_answers.append(candidate_answer)
+                kept_spans.add(*span)
         return {"filtered_answers": final_answers}
 
+class BatchedExtractiveReader(ExtractiveReader):
+    """
+    ExtractiveReader that answers many (question, documents) pairs in one run: every pair is tokenized
+    together and the QA model processes the resulting sequences in shared forward passes of
+    max_batch_size. Answers of each question are ranked exactly as separate run() calls would rank them.
+
+    With a fast tokenizer, question token encodings are kept in a bounded LRU cache and every distinct
+    context is encoded once per run; pairs are then assembled by the tokenizer's own post-processing
+    (special tokens, only_second truncation with stride, overflow windows). The first run checks this
+    against the regular pair tokenization and falls back to it if anything differs.
+    """
+
+    def __init__(self, *args, question_cache_size: int = 1024, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.question_cache_size = question_cache_size
+        self.question_cache_hits = 0
+        self.question_cache_misses = 0
+        self._question_encodings: "OrderedDict[str, Any]" = OrderedDict()
+        self._use_cached_encodings = question_cache_size > 0
+        self._parity_checked = False
+
+    def question_cache_stats(self) -> Dict[str, int]:
+        return {"hits": self.question_cache_hits, "misses": self.question_cache_misses,
+                "entries": len(self._question_encodings)}
+
+    def _encode_questions(self, questions: List[str]) -> Dict[str, Any]:
+        """Question encodings without special tokens, from the LRU cache or freshly encoded (truncation must be off)."""
+        unique_questions = list(dict.fromkeys(questions))
+        missing = [q for q in unique_questions if q not in self._question_encodings]
+        self.question_cache_hits += len(unique_questions) - len(missing)
+        self.question_cache_misses += len(missing)
+        if missing:
+            new_encodings = self.tokenizer.backend_tokenizer.encode_batch(missing, add_special_tokens=False)
+            self._question_encodings.update(zip(missing, new_encodings))
+
+        encodings = {}
+        for q in unique_questions:
+            self._question_encodings.move_to_end(q)
+            encodings[q] = self._question_encodings[q]
+        while len(self._question_encodings) > self.question_cache_size:
+            self._question_encodings.popitem(last=False)
+        return encodings
+
+    def _preprocess_with_cached_encodings(self, queries, documents, max_seq_length, query_ids, stride):
+        """Same outputs as ExtractiveReader._preprocess, built from cached question and per-run context encodings."""
+        backend = self.tokenizer.backend_tokenizer
+        pairs = [(doc_idx, query, doc.content) for doc_idx, (query, doc) in enumerate(zip(queries, documents))
+                 if doc.content is not None]
+
+        backend.no_truncation()
+        backend.no_padding()
+        question_encodings = self._encode_questions([query for _, query, _ in pairs])
+        contexts = list(dict.fromkeys(content for _, _, content in pairs))
+        context_encodings = dict(zip(contexts, backend.encode_batch(contexts, add_special_tokens=False)))
+
+        # post_process applies the tokenizer's truncation settings exactly as a pair encode would
+        backend.enable_truncation(max_seq_length, stride=stride, strategy="only_second",
+                                  direction=self.tokenizer.truncation_side)
+        try:
+            encodings, sample_ids = [], []
+            for doc_idx, query, content in pairs:
+                encoding = backend.post_process(question_encodings[query], context_encodings[content],
+                                                add_special_tokens=True)
+                for window in [encoding] + encoding.overflowing:
+                    encodings.append(window)
+                    sample_ids.append(doc_idx)
+        finally:
+            backend.no_truncation()
+
+        longest = max(len(encoding.ids) for encoding in encodings)
+        for encoding in encodings:
+            encoding.pad(longest, direction=self.tokenizer.padding_side, pad_id=self.tokenizer.pad_token_id,
+                         pad_type_id=self.tokenizer.pad_token_type_id, pad_token=self.tokenizer.pad_token)
+
+        device = self.device.first_device.to_torch()
+        input_ids = torch.tensor([encoding.ids for encoding in encodings], device=device)
+        attention_mask = torch.tensor([encoding.attention_mask for encoding in encodings], device=device)
+        sequence_ids = torch.tensor(
+            [[id_ if id_ is not None else -1 for id_ in encoding.sequence_ids] for encoding in encodings],
+            device=device,
+        )
+        return (input_ids, attention_mask, sequence_ids, encodings,
+                [query_ids[doc_idx] for doc_idx in sample_ids], sample_ids)
+
+    def _preprocess(self, *, queries, documents, max_seq_length, query_ids, stride):
+        has_content = any(doc.content is not None for doc in documents)
+        if not self._use_cached_encodings or not has_content or not getattr(self.tokenizer, "is_fast", False):
+            return super()._preprocess(queries=queries, documents=documents, max_seq_length=max_seq_length,
+                                       query_ids=query_ids, stride=stride)
+
+        result = self._preprocess_with_cached_encodings(queries, documents, max_seq_length, query_ids, stride)
+        if not self._parity_checked and all(doc.content is not None for doc in documents):
+            self._parity_checked = True
+            expected = super()._preprocess(queries=queries, documents=documents, max_seq_length=max_seq_length,
+                                           query_ids=query_ids, stride=stride)
+            same = (torch.equal(result[0], expected[0]) and torch.equal(result[1], expected[1])
+                    and torch.equal(result[2], expected[2]) and list(result[4]) == list(expected[4])
+                    and list(result[5]) == list(expected[5])
+                    and all(a.offsets == b.offsets for a, b in zip(result[3], expected[3])))
+            if not same:
+                logging.warning("Cached question encodings do not match the reader's tokenization; disabling them.")
+                self._use_cached_encodings = False
+                return expected
+        return result
+
+    def run_batch(
+            self,
+            queries: List[str],
+            documents: List[List[Document]],
+            top_k: Optional[int] = None,
+            score_threshold: Optional[float] = None,
+            max_seq_length: Optional[int] = None,
+            stride: Optional[int] = None,
+            max_batch_size: Optional[int] = None,
+            answers_per_seq: Optional[int] = None,
+            no_answer: Optional[bool] = None,
+            overlap_threshold: Optional[float] = None,
+    ) -> List[List[Answer]]:
+        """
+        Same parameters as ExtractiveReader.run, with one list of documents per query.
+        Returns the answers of each query, in query order.
+        """
+        if self.model is None:
+            raise RuntimeError("The reader was not warmed up. Run 'warm_up()' before calling 'run_batch()'.")
+        if not queries:
+            return []
+
+        top_k = top_k or self.top_k
+        score_threshold = score_threshold or self.score_threshold
+        max_seq_length = max_seq_length or self.max_seq_length
+        stride = stride or self.stride
+        max_batch_size = max_batch_size or self.max_batch_size
+        answers_per_seq = answers_per_seq or self.answers_per_seq or 20
+        no_answer = no_answer if no_answer is not None else self.no_answer
+        overlap_threshold = overlap_threshold or self.overlap_threshold
+
+        flattened_queries, flattened_documents, query_ids = ExtractiveReader._flatten_documents(queries, documents)
+        input_ids, attention_mask, sequence_ids, encodings, query_ids, document_ids = self._preprocess(
+            queries=flattened_queries,
+            documents=flattened_documents,
+            max_seq_length=max_seq_length,
+            query_ids=query_ids,
+            stride=stride,
+        )
+
+        batch_size = max_batch_size or input_ids.shape[0]
+        start_logits_list, end_logits_list = [], []
+        for start_index in range(0, input_ids.shape[0], batch_size):
+            with torch.inference_mode():
+                output = self.model(
+                    input_ids=input_ids[start_index:start_index + batch_size],
+                    attention_mask=attention_mask[start_index:start_index + batch_size],
+                )
+            start_logits_list.append(output.start_logits)
+            end_logits_list.append(output.end_logits)
+
+        start, end, probabilities = self._postprocess(
+            start=torch.cat(start_logits_list),
+            end=torch.cat(end_logits_list),
+            sequence_ids=sequence_ids,
+            attention_mask=attention_mask,
+            answers_per_seq=answers_per_seq,
+            encodings=encodings,
+        )
+        return self._nest_answers(
+            start=start,
+            end=end,
+            probabilities=probabilities,
+            flattened_documents=flattened_documents,
+            queries=queries,
+            answers_per_seq=answers_per_seq,
+            top_k=top_k,
+            score_threshold=score_threshold,
+            query_ids=query_ids,
+            document_ids=document_ids,
+            no_answer=no_answer,
+            overlap_threshold=overlap_threshold,
+        )
+
+
+def _answer_to_record(answer: Answer) -> Dict[str, Any]:
+    offset = getattr(answer, 'document_offset', None)
+    return {"data": answer.data, "score": answer.score, "start": offset.start if offset else None,
+            "end": offset.end if offset else None, "meta": dict(answer.meta)}
+
+
+def _record_to_answer(record: Dict[str, Any], query: str, document: Document) -> Answer:
+    offset = ExtractedAnswer.Span(record["start"], record["end"]) if record["start"] is not None else None
+    return ExtractedAnswer(query=query, score=record["score"], data=record["data"],
+                           document=document if record["data"] is not None else None,
+                           document_offset=offset, meta=dict(record["meta"]))
+
+
+def reader_model_identity(model_name_or_path: str) -> str:
+    """Identity of a local QA model (its weight files) or, for a hub model, its name."""
+    path = Path(model_name_or_path)
+    if path.is_dir():
+        weights = sorted(path.glob("*.safetensors")) + sorted(path.glob("*.bin"))
+        return ";".join(checkpoint_identity(str(weight)) for weight in weights) or str(path.resolve())
+    if path.is_file():
+        return checkpoint_identity(model_name_or_path)
+    return model_name_or_path
+
+
 class ExpertInstanceExtractor:
     """
     Orchestrates Haystack components and applies advanced heuristic filtering
@@ -75,12 +351,34 @@ class ExpertInstanceExtractor:
             model_name_or_path: str,
             device: Optional[str] = None,
             reader_top_k: int = 20,  # Increased to get more candidates
+            reader_batch_size: int = 32,  # Sequences per QA forward pass across all questions and contexts
+            question_cache_size: int = 1024,  # Concepts whose questions and question encodings are memoized
+            answer_cache_path: Optional[str] = None,  # On-disk cache of raw reader answers (SQLite file)
+            answer_cache_max_entries: int = 200_000,
     ):
-        self.q_gen = QuestionGenerator()
-        self.reader = ExtractiveReader(model=model_name_or_path, device=device, top_k=reader_top_k, no_answer=True)
+        self.q_gen = QuestionGenerator(cache_size=question_cache_size)
+        self.reader = BatchedExtractiveReader(model=model_name_or_path, device=device, top_k=reader_top_k,
+                                              no_answer=True, max_batch_size=reader_batch_size,
+                                              # QuestionGenerator asks four questions per concept
+                                              question_cache_size=4 * question_cache_size)
         self.filter = AnswerFilter()
         self.reader.warm_up()
 
+        self.answer_cache = None
+        if answer_cache_path:
+            reader = self.reader
+            # Everything besides the text that changes the raw answers is part of the identity
+            settings = (f"top_k={reader.top_k}:max_seq_length={reader.max_seq_length}:stride={reader.stride}:"
+                        f"answers_per_seq={reader.answers_per_seq}:no_answer={reader.no_answer}:"
+                        f"calibration_factor={reader.calibration_factor}:score_threshold={reader.score_threshold}:"
+                        f"overlap_threshold={reader.overlap_threshold}")
+            self.answer_cache = ReaderAnswerCache(
+                answer_cache_path,
+                reader_identity=f"{reader_model_identity(model_name_or_path)}|{settings}",
+                max_entries=answer_cache_max_entries
+            )
+            logging.info(f"Reader answer cache enabled at: {answer_cache_path}")
+
         self.FUNCTION_WORDS = {'a', 'an', 'the', 'in', 'on', 'of', 'for', 'to', 'with', 'by', 'at', 'is', 'are', 'was',
                                'were', 'be', 'been', 'being', 'have', 'has', 'had', 'do', 'does', 'did', 'will',
                                'would', 'should', 'can', 'could', 'may', 'might', 'must', 'one', 'two', 'three', 'four',
@@ -90,6 +388,28 @@ class ExpertInstanceExtractor:
                                'older', 'newer', 'red', 'green', 'blue', 'performance-critical', 'sections'}
         logging.info("ExpertInstanceExtractor components are initialized and ready.")
 
+    def cache_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Hit/miss counters of the question cache, the reader's question-encoding cache and the answer cache."""
+        stats = {"questions": self.q_gen.cache_stats(), "question_encodings": self.reader.question_cache_stats()}
+        if self.answer_cache is not None:
+            stats["answers"] = self.answer_cache.stats()
+        return stats
+
+    def warm_answer_cache(self, pairs: List[Tuple[str, str]], pairs_per_reader_run: int = 64) -> int:
+        """
+        Offline warm-up: runs the reader on every (context, abstract_concept) pair whose answers are not cached
+        yet, without filtering. Returns the number of pairs processed.
+        """
+        if self.answer_cache is None:
+            raise ValueError("warm_answer_cache needs an answer_cache_path.")
+        pairs = [(context, abstract_concept) for context, abstract_concept in pairs if context and abstract_concept]
+        for start in range(0, len(pairs), pairs_per_reader_run):
+            self._run_reader([
+                (context, self.q_gen.run(abstract_concept=abstract_concept)["questions"])
+                for context, abstract_concept in pairs[start:start + pairs_per_reader_run]
+            ])
+        return len(pairs)
+
     def _is_valid_instance(self, span: str, abstract_concept: str) -> bool:
         """
         A final, intelligent validation gate to ensure the answer is a clean entity.
@@ -108,24 +428,120 @@ class ExpertInstanceExtractor:
 
         return True
 
+    def _run_reader(self, jobs: List[Tuple[str, List[str]]]) -> List[List[Answer]]:
+        """
+        Answers every question of every (context, questions) job in one batched reader run.
+        A question asked more than once about the same context (e.g. by two concepts with the same plural)
+        is run once and its answers are shared.
+        Returns the raw answers of each job, concatenated in question order like the per-question loop did.
+        With an answer cache, only uncached (context, question) pairs reach the reader.
+        If the batched run fails, questions are retried one at a time and failing ones are skipped.
+        """
+        queries, documents, query_index = [], [], {}
+        docs_by_context: Dict[str, List[Document]] = {}
+        owners: List[List[int]] = []
+        for context, questions in jobs:
+            docs = docs_by_context.setdefault(context, [Document(content=context)])
+            job_queries = []
+            for q in questions:
+                if (context, q) not in query_index:
+                    query_index[(context, q)] = len(queries)
+                    queries.append(q)
+                    documents.append(docs)
+                job_queries.append(query_index[(context, q)])
+            owners.append(job_queries)
+
+        raw_answers: List[List[Answer]] = [[] for _ in jobs]
+        if not queries:
+            return raw_answers
+
+        answers_per_query: List[Optional[List[Answer]]] = [None] * len(queries)
+        if self.answer_cache is not None:
+            pairs = [(docs[0].content, q) for q, docs in zip(queries, documents)]
+            for query_idx, records in enumerate(self.answer_cache.get_answers(pairs)):
+                if records is not None:
+                    answers_per_query[query_idx] = [
+                        _record_to_answer(record, queries[query_idx], documents[query_idx][0]) for record in records
+                    ]
+        miss_indices = [query_idx for query_idx, answers in enumerate(answers_per_query) if answers is None]
+
+        if miss_indices:
+            miss_queries = [queries[query_idx] for query_idx in miss_indices]
+            miss_documents = [documents[query_idx] for query_idx in miss_indices]
+            failed = set()
+            try:
+                miss_answers = self.reader.run_batch(queries=miss_queries, documents=miss_documents)
+            except Exception as e:
+                logging.error(f"Error running batched reader, falling back to one question at a time: {e}")
+                miss_answers = []
+                for q, docs in zip(miss_queries, miss_documents):
+                    try:
+                        miss_answers.append(self.reader.run(query=q, documents=docs).get("answers", []))
+                    except Exception as e:
+                        logging.error(f"Error running reader for question '{q}': {e}")
+                        failed.add(len(miss_answers))
+                        miss_answers.append([])
+
+            for row, query_idx in enumerate(miss_indices):
+                answers_per_query[query_idx] = miss_answers[row]
+            if self.answer_cache is not None:
+                # Stored before any filtering touches the answers' meta
+                stored = [row for row in range(len(miss_indices)) if row not in failed]
+                self.answer_cache.put_answers(
+                    [(miss_documents[row][0].content, miss_queries[row]) for row in stored],
+                    [[_answer_to_record(answer) for answer in miss_answers[row]] for row in stored]
+                )
+
+        for job_idx, job_queries in enumerate(owners):
+            for query_idx in job_queries:
+                raw_answers[job_idx].extend(answers_per_query[query_idx])
+        return raw_answers
+
     def extract(self, context: str, abstract_concept: str) -> List[Tuple[str, float]]:
         """
         Runs the full extraction and filtering pipeline.
         """
         if not context or not abstract_concept:
             return []
-        docs = [Document(content=context)]
-        questions = self.q_gen.run(abstract_concept=abstract_concept)["questions"]
+        return self.extract_batch([context], abstract_concept)[0]
 
-        all_raw_answers: List[Answer] = []
-        for q in questions:
-            try:
-                reader_result = self.reader.run(query=q, documents=docs)
-                all_raw_answers.extend(reader_result.get("answers", []))
-            except Exception as e:
-                logging.error(f"Error running reader for question '{q}': {e}")
-                continue
+    def extract_batch(self, contexts: List[str], abstract_concept: str) -> List[List[Tuple[str, float]]]:
+        """
+        extract() over many contexts: all questions of all contexts share one batched reader run.
+        Returns the instances of each context, in order.
+        """
+        return self.extract_jobs([(context, abstract_concept) for context in contexts])
+
+    def extract_many(self, context: str, abstract_concepts: List[str]) -> Dict[str, List[Tuple[str, float]]]:
+        """
+        extract() for many concepts of one context: the questions of all concepts are generated up front,
+        identical questions are asked once, and everything goes through one batched reader run before the
+        answers are split per concept through the usual filter and validity logic.
+        Returns a dict of concept -> instances.
+        """
+        if not context:
+            return {abstract_concept: [] for abstract_concept in abstract_concepts}
+        unique_concepts = list(dict.fromkeys(abstract_concepts))
+        results = self.extract_jobs([(context, abstract_concept) for abstract_concept in unique_concepts])
+        return dict(zip(unique_concepts, results))
+
+    def extract_jobs(self, pairs: List[Tuple[str, str]]) -> List[List[Tuple[str, float]]]:
+        """
+        extract() over arbitrary (context, abstract_concept) pairs, e.g. every concept of every paragraph
+        of a document, in one batched reader run. Returns the instances of each pair, in order.
+        """
+        jobs = [
+            (context, self.q_gen.run(abstract_concept=abstract_concept)["questions"] if context and abstract_concept else [])
+            for context, abstract_concept in pairs
+        ]
+        raw_answers_per_job = self._run_reader(jobs)
+        return [
+            self._postprocess_answers(raw_answers, abstract_concept) if abstract_concept else []
+            for raw_answers, (_, abstract_concept) in zip(raw_answers_per_job, pairs)
+        ]
 
+    def _postprocess_answers(self, all_raw_answers: List[Answer], abstract_concept: str) -> List[Tuple[str, float]]:
+        """Applies the AnswerFilter, proper-noun ranking and validity gate to the raw answers of one context."""
         filter_result = self.filter.run(answers=all_raw_answers)
         candidate_answers = filter_result["filtered_answers"]
 
@@ -205,6 +621,7 @@ if __name__ == "__main__":
                     print(f"- {span!r} (score: {score:.3f})")
             else:
                 print("No instances found.")
+        print(f"\nCache stats: {extractor.cache_stats()}")
     except Exception as e:
         logging.error(f"An error occurred during execution: {e}", exc_info=True)
         print("\nPlease ensure you have the required packages (`pip install farm-haystack haystack-ai`)")
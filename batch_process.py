@@ -0,0 +1,187 @@
+import argparse
+import glob
+import hashlib
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import torch
+
+from process_document import DocumentProcessor
+from result_cache import checkpoint_identity
+
+# Set once per worker process by _init_worker, so the model is loaded a single time per worker
+_worker_processor = None
+
+
+def _init_worker(processor_kwargs: dict, threads_per_worker: int):
+    global _worker_processor
+    torch.set_num_threads(threads_per_worker)
+    _worker_processor = DocumentProcessor(**processor_kwargs)
+
+
+def _process_document(input_path: str, output_path: str, fingerprint: str) -> int:
+    """Runs in a worker: classifies one document, writes its JSON and then its fingerprint sidecar."""
+    text_content = Path(input_path).read_text(encoding='utf-8')
+    results = _worker_processor.process_text_content(text_content, title=Path(input_path).stem)
+    DocumentProcessor.save_to_json(data=results, output_file_path=output_path)
+    # Written last: a document only counts as up to date once its output is complete
+    Path(output_path + ".sha256").write_text(fingerprint, encoding='utf-8')
+    return len(results['paragraphs'])
+
+
+def collect_inputs(input_dir: str = None, input_glob: str = None, manifest: str = None) -> tuple[Path, list[Path]]:
+    """
+    Resolves the documents to process from a directory (all *.txt files, recursively), a glob pattern or a
+    manifest file (one path per line, relative paths resolved against the manifest's directory).
+    Returns the root the output tree is mirrored from, and the sorted input paths.
+    """
+    if input_dir:
+        root = Path(input_dir).resolve()
+        # Not resolved: a symlink under root may point outside it, but its output still mirrors its place in root
+        paths = [path for path in root.rglob("*.txt") if path.is_file()]
+    else:
+        if input_glob:
+            paths = [Path(path).resolve() for path in glob.glob(input_glob, recursive=True)]
+        else:
+            manifest_dir = Path(manifest).resolve().parent
+            lines = Path(manifest).read_text(encoding='utf-8').splitlines()
+            paths = [(manifest_dir / line.strip()).resolve() for line in lines if line.strip()]
+        paths = [path for path in paths if path.is_file()]
+        root = Path(os.path.commonpath([str(path.parent) for path in paths])) if paths else Path.cwd()
+    return root, sorted(set(paths))
+
+
+def document_fingerprint(input_path: Path, settings_key: str) -> str:
+    """Hash of the document bytes and of everything that influences its output (model and settings)."""
+    digest = hashlib.sha256(settings_key.encode('utf-8'))
+    with open(input_path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def is_up_to_date(output_path: Path, fingerprint: str) -> bool:
+    sidecar = Path(str(output_path) + ".sha256")
+    return output_path.exists() and sidecar.exists() and sidecar.read_text(encoding='utf-8') == fingerprint
+
+
+def run_batch(inputs: list[Path], root: Path, output_dir: str, processor_kwargs: dict, workers: int,
+              threads_per_worker: int, force: bool = False) -> dict:
+    """Distributes documents across a process pool and returns a throughput summary."""
+    settings_key = json.dumps({
+        "checkpoint": checkpoint_identity(processor_kwargs["checkpoint_path"]),
+        # Caching and pipelining change how fast results are produced, not the results
+        **{key: value for key, value in processor_kwargs.items()
+           if key not in ("checkpoint_path", "cache_path", "pipeline_workers", "queue_depth")},
+    }, sort_keys=True)
+
+    jobs, skipped, unmapped = [], 0, 0
+    for input_path in inputs:
+        try:
+            output_path = Path(output_dir) / input_path.relative_to(root).with_suffix(".json")
+        except ValueError:
+            unmapped += 1
+            print(f"ERROR: Skipping {input_path}: it is not under the input root {root}.")
+            continue
+        fingerprint = document_fingerprint(input_path, settings_key)
+        if not force and is_up_to_date(output_path, fingerprint):
+            skipped += 1
+            continue
+        jobs.append((str(input_path), str(output_path), fingerprint))
+    print(f"Found {len(inputs)} documents: {len(jobs)} to process, {skipped} up to date.")
+
+    summary = {"documents": len(inputs), "processed": 0, "skipped": skipped, "failed": unmapped, "paragraphs": 0}
+    start_time = time.perf_counter()
+    if jobs:
+        # spawn: every worker loads its own model, and CUDA does not survive a fork
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_worker,
+                                 initargs=(processor_kwargs, threads_per_worker)) as executor:
+            futures = {executor.submit(_process_document, *job): job[0] for job in jobs}
+            for future in as_completed(futures):
+                try:
+                    summary["paragraphs"] += future.result()
+                    summary["processed"] += 1
+                except Exception as e:
+                    summary["failed"] += 1
+                    print(f"ERROR: Failed to process {futures[future]}: {e}")
+
+    elapsed = time.perf_counter() - start_time
+    summary["seconds"] = round(elapsed, 2)
+    summary["docs_per_second"] = round(summary["processed"] / elapsed, 3) if elapsed > 0 else 0.0
+    summary["paragraphs_per_second"] = round(summary["paragraphs"] / elapsed, 2) if elapsed > 0 else 0.0
+    return summary
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Process many text documents with a pool of model-loaded workers.")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--input_dir", type=str, help="Directory searched recursively for .txt files.")
+    source.add_argument("--input_glob", type=str, help="Glob pattern of input files (supports **).")
+    source.add_argument("--manifest", type=str, help="File listing one input path per line.")
+    parser.add_argument("--output_dir", type=str, required=True, help="Root of the mirrored output tree of .json files.")
+    parser.add_argument("--checkpoint_path", type=str, default="checkpoints/best-checkpoint-epoch=02-val_loss=0.90.ckpt", help="Path to the trained model .ckpt file.")
+    parser.add_argument("--workers", type=int, default=2, help="Number of worker processes, each with its own model.")
+    parser.add_argument("--threads_per_worker", type=int, default=None,
+                        help="torch threads per worker (defaults to CPU count divided by workers).")
+    parser.add_argument("--threshold", type=float, default=0.9,
+                        help="Confidence threshold to fallback to previous paragraph's prediction.")
+    parser.add_argument("--allowed_senses", type=str, default=None,
+                        help="Comma-separated list of allowed sense class IDs (e.g., '2,3').")
+    parser.add_argument("--allowed_ages", type=str, default=None,
+                        help="Comma-separated list of allowed age class IDs (e.g., '0,1').")
+    parser.add_argument("--batch_size", type=int, default=16, help="Paragraphs per forward pass.")
+    parser.add_argument("--backend", type=str, choices=["torch", "onnx"], default="torch",
+                        help="Inference backend; with 'onnx', --checkpoint_path is an onnx_backend.py export directory.")
+    parser.add_argument("--sliding_window", action="store_true",
+                        help="Classify paragraphs longer than the token budget as overlapping windows instead of truncating them.")
+    parser.add_argument("--window_overlap", type=int, default=32, help="Tokens shared by neighbouring windows.")
+    parser.add_argument("--window_aggregation", type=str, choices=["mean", "max"], default="mean",
+                        help="Combine window probabilities by their mean or keep the most confident window.")
+    parser.add_argument("--token_chunking", action="store_true",
+                        help="Size paragraphs to the model's token budget instead of ~128 words.")
+    parser.add_argument("--quantize", action="store_true",
+                        help="Use the dynamic INT8 quantized model on CPU (created next to the checkpoint on first use).")
+    parser.add_argument("--pipeline_workers", type=int, default=0,
+                        help="Tokenizer threads per worker feeding its model from a background producer; 0 disables.")
+    parser.add_argument("--queue_depth", type=int, default=4,
+                        help="Prepared batches each worker's pipeline may hold ahead of its model.")
+    parser.add_argument("--cache_path", type=str, default=None,
+                        help="Path to an on-disk cache of paragraph probabilities shared by all workers.")
+    parser.add_argument("--force", action="store_true", help="Reprocess documents even if their output is up to date.")
+    args = parser.parse_args()
+
+    allowed_senses_ids = [int(id_str) for id_str in args.allowed_senses.split(',')] if args.allowed_senses else None
+    allowed_ages_ids = [int(id_str) for id_str in args.allowed_ages.split(',')] if args.allowed_ages else None
+    threads_per_worker = args.threads_per_worker or max(1, (os.cpu_count() or 1) // args.workers)
+
+    root, inputs = collect_inputs(args.input_dir, args.input_glob, args.manifest)
+    summary = run_batch(
+        inputs, root, args.output_dir,
+        processor_kwargs=dict(
+            checkpoint_path=args.checkpoint_path,
+            confidence_threshold=args.threshold,
+            allowed_senses=allowed_senses_ids,
+            allowed_ages=allowed_ages_ids,
+            batch_size=args.batch_size,
+            cache_path=args.cache_path,
+            quantize=args.quantize,
+            backend=args.backend,
+            sliding_window=args.sliding_window,
+            window_overlap=args.window_overlap,
+            window_aggregation=args.window_aggregation,
+            token_chunking=args.token_chunking,
+            pipeline_workers=args.pipeline_workers,
+            queue_depth=args.queue_depth
+        ),
+        workers=args.workers,
+        threads_per_worker=threads_per_worker,
+        force=args.force
+    )
+
+    print("\n--- Batch ingestion summary ---")
+    print(json.dumps(summary, indent=4))
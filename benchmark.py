@@ -0,0 +1,374 @@
+import argparse
+import io
+import json
+import math
+import random
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import torch
+from types import SimpleNamespace
+
+
+def _state_dict_megabytes(model) -> float:
+    buffer = io.BytesIO()
+    torch.save(model.state_dict(), buffer)
+    return buffer.getbuffer().nbytes / 1e6
+
+
+def _evaluate(model, dataloader, max_batches: int = None) -> dict:
+    """Accuracy of both tasks and per-batch latency of one model over a dataloader (CPU)."""
+    latencies, sense_correct, age_correct, total = [], 0, 0, 0
+    sense_preds, age_preds = [], []
+    with torch.no_grad():
+        for batch_idx, batch in enumerate(dataloader):
+            if max_batches is not None and batch_idx >= max_batches:
+                break
+            start = time.perf_counter()
+            sense_logits, age_logits = model(batch["input_ids"], batch["attention_mask"])
+            latencies.append(time.perf_counter() - start)
+
+            batch_sense_preds = sense_logits.argmax(dim=1)
+            batch_age_preds = age_logits.argmax(dim=1)
+            sense_correct += (batch_sense_preds == batch["sense_labels"]).sum().item()
+            age_correct += (batch_age_preds == batch["age_labels"]).sum().item()
+            total += len(batch_sense_preds)
+            sense_preds.append(batch_sense_preds)
+            age_preds.append(batch_age_preds)
+
+    latencies_ms = sorted(latency * 1000 for latency in latencies)
+    return {
+        "samples": total,
+        "sense_accuracy": sense_correct / total if total else 0.0,
+        "age_accuracy": age_correct / total if total else 0.0,
+        "mean_batch_latency_ms": statistics.mean(latencies_ms) if latencies_ms else 0.0,
+        "p95_batch_latency_ms": latencies_ms[int(0.95 * (len(latencies_ms) - 1))] if latencies_ms else 0.0,
+        "samples_per_second": total / sum(latencies) if latencies else 0.0,
+        "sense_preds": torch.cat(sense_preds) if sense_preds else torch.empty(0),
+        "age_preds": torch.cat(age_preds) if age_preds else torch.empty(0),
+    }
+
+
+def benchmark_quantization(args) -> dict:
+    """Compares the fp32 model against its dynamic INT8 version on the test split of TextDataModule."""
+    from dataset import TextDataModule
+    from model import RoBERTaMultiTaskClassifier
+    from quantization import load_quantized_model
+    from train import MODEL_NAME, MAX_TOKEN_COUNT, RANDOM_STATE
+
+    torch.set_num_threads(args.threads)
+    data_module = TextDataModule(
+        data_path=args.dataset_path, batch_size=args.batch_size, max_token_len=MAX_TOKEN_COUNT,
+        model_name=MODEL_NAME, random_state=RANDOM_STATE
+    )
+    data_module.setup()
+    test_loader = data_module.test_dataloader()
+
+    fp32_model = RoBERTaMultiTaskClassifier.load_from_checkpoint(checkpoint_path=args.checkpoint_path,
+                                                                 map_location="cpu")
+    fp32_model.freeze()
+    fp32_model.eval()
+    int8_model = load_quantized_model(args.checkpoint_path)
+
+    report = {}
+    for name, model in (("fp32", fp32_model), ("int8", int8_model)):
+        print(f"Evaluating {name} model...")
+        report[name] = _evaluate(model, test_loader, args.max_batches)
+        report[name]["state_dict_mb"] = _state_dict_megabytes(model)
+
+    fp32_results, int8_results = report["fp32"], report["int8"]
+    report["int8_vs_fp32"] = {
+        "sense_agreement": (fp32_results.pop("sense_preds") == int8_results.pop("sense_preds")).float().mean().item(),
+        "age_agreement": (fp32_results.pop("age_preds") == int8_results.pop("age_preds")).float().mean().item(),
+        "speedup": int8_results["samples_per_second"] / fp32_results["samples_per_second"]
+        if fp32_results["samples_per_second"] else 0.0,
+        "size_ratio": int8_results["state_dict_mb"] / fp32_results["state_dict_mb"],
+    }
+    return report
+
+
+def _time_forward(model, batches: list[dict], repeats: int) -> dict:
+    """Latency of every (batch, repeat) forward pass plus overall throughput."""
+    latencies, samples = [], 0
+    with torch.no_grad():
+        for _ in range(repeats):
+            for batch in batches:
+                start = time.perf_counter()
+                model(batch["input_ids"], batch["attention_mask"])
+                latencies.append(time.perf_counter() - start)
+                samples += len(batch["input_ids"])
+
+    latencies_ms = sorted(latency * 1000 for latency in latencies)
+    return {
+        "mean_batch_latency_ms": statistics.mean(latencies_ms),
+        "p95_batch_latency_ms": latencies_ms[int(0.95 * (len(latencies_ms) - 1))],
+        "samples_per_second": samples / sum(latencies),
+    }
+
+
+def benchmark_onnx(args) -> dict:
+    """
+    PyTorch vs ONNX Runtime on chunks of a text file: max absolute logit difference, argmax agreement,
+    and latency/throughput of the forward pass at the given batch size.
+    """
+    from model import RoBERTaMultiTaskClassifier
+    from onnx_backend import OnnxClassifier
+    from process_document import DocumentProcessor
+    from text_cleaning import clean_texts
+
+    torch.set_num_threads(args.threads)
+    with open(args.input_file, "r", encoding="utf-8") as f:
+        chunks = DocumentProcessor._chunk_text(f.read())[:args.max_chunks]
+    torch_model = RoBERTaMultiTaskClassifier.load_from_checkpoint(checkpoint_path=args.checkpoint_path,
+                                                                  map_location="cpu")
+    torch_model.freeze()
+    torch_model.eval()
+    onnx_model = OnnxClassifier(args.onnx_dir, intra_op_num_threads=args.threads)
+
+    cleaned = clean_texts(chunks)
+    batches = [
+        onnx_model.tokenizer(cleaned[i:i + args.batch_size], max_length=onnx_model.max_token_len,
+                             padding="longest", truncation=True, return_tensors="pt")
+        for i in range(0, len(cleaned), args.batch_size)
+    ]
+
+    max_sense_diff, max_age_diff, sense_agree, age_agree = 0.0, 0.0, 0, 0
+    with torch.no_grad():
+        for batch in batches:
+            torch_sense, torch_age = torch_model(batch["input_ids"], batch["attention_mask"])
+            onnx_sense, onnx_age = onnx_model(batch["input_ids"], batch["attention_mask"])
+            max_sense_diff = max(max_sense_diff, (torch_sense - onnx_sense).abs().max().item())
+            max_age_diff = max(max_age_diff, (torch_age - onnx_age).abs().max().item())
+            sense_agree += (torch_sense.argmax(dim=1) == onnx_sense.argmax(dim=1)).sum().item()
+            age_agree += (torch_age.argmax(dim=1) == onnx_age.argmax(dim=1)).sum().item()
+
+    report = {
+        "chunks": len(chunks),
+        "parity": {
+            "max_abs_diff_sense_logits": max_sense_diff,
+            "max_abs_diff_age_logits": max_age_diff,
+            "sense_argmax_agreement": sense_agree / len(chunks) if chunks else 0.0,
+            "age_argmax_agreement": age_agree / len(chunks) if chunks else 0.0,
+            "within_tolerance": max(max_sense_diff, max_age_diff) <= args.tolerance,
+        },
+    }
+    report["passed"] = report["parity"]["within_tolerance"]
+    for name, model in (("torch", torch_model), ("onnx", onnx_model)):
+        print(f"Timing {name} backend...")
+        _time_forward(model, batches[:1], 1)  # warm-up
+        report[name] = _time_forward(model, batches, args.repeats)
+    report["onnx_speedup"] = report["onnx"]["samples_per_second"] / report["torch"]["samples_per_second"]
+    return report
+
+
+def _pairwise_answer_filter(answer_filter, answers: list) -> list:
+    """The original O(n^2) AnswerFilter.run loop: timing baseline and reference of tests/test_answer_filter.py."""
+    for ans in answers:
+        ans.meta['normalized_score'] = ans.score / math.log(len(ans.data) + 1.1) if ans.data else 0
+    sorted_answers = sorted(answers, key=lambda ans: ans.meta.get('normalized_score', 0), reverse=True)
+    final_answers = []
+    for candidate_answer in sorted_answers:
+        if candidate_answer.data is None:
+            continue
+        if not any(answer_filter._is_overlapping(candidate_answer, kept) for kept in final_answers):
+            final_answers.append(candidate_answer)
+    return final_answers
+
+
+def _random_answers(rng: random.Random, count: int, context_length: int) -> list:
+    """Reader-like candidates: short random spans with coarse (often tied) scores, some without span or text."""
+    answers = []
+    for _ in range(count):
+        start = rng.randrange(context_length)
+        meta = {} if rng.random() < 0.05 else {"start": start, "end": start + rng.randint(0, 12)}
+        data = None if rng.random() < 0.05 else "x" * rng.randint(0, 20)
+        answers.append(SimpleNamespace(data=data, score=round(rng.random(), 2), meta=meta))
+    return answers
+
+
+def benchmark_answer_filter(args) -> dict:
+    """
+    Times the indexed AnswerFilter against the pairwise loop at several candidate counts.
+    Their equivalence is checked by tests/test_answer_filter.py.
+    """
+    from ROAST import AnswerFilter
+
+    answer_filter, rng = AnswerFilter(), random.Random(args.seed)
+    report = {"timings": {}}
+    for count in args.candidates:
+        answers = _random_answers(rng, count, context_length=max(count * 4, 100))
+        timings = {}
+        for name, run in (("pairwise", lambda: _pairwise_answer_filter(answer_filter, answers)),
+                          ("indexed", lambda: answer_filter.run(answers=answers))):
+            start = time.perf_counter()
+            for _ in range(args.repeats):
+                run()
+            timings[f"{name}_ms"] = (time.perf_counter() - start) * 1000 / args.repeats
+        timings["speedup"] = timings["pairwise_ms"] / timings["indexed_ms"] if timings["indexed_ms"] else 0.0
+        report["timings"][str(count)] = timings
+    return report
+
+
+# Runs in a fresh interpreter; the report is the last line of its output
+_STARTUP_SCRIPT = """
+import json, resource, sys, time
+start = time.perf_counter()
+from process_document import DocumentProcessor
+imported = time.perf_counter()
+processor = DocumentProcessor(checkpoint_path=sys.argv[1], backend=sys.argv[2], quantize=sys.argv[3] == "1")
+loaded = time.perf_counter()
+load_peak_rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+processor._predict_batch_with_probabilities([sys.argv[4]], show_progress=False)
+predicted = time.perf_counter()
+heavy_modules = ["pytorch_lightning", "torchmetrics", "matplotlib", "seaborn", "pandas", "tqdm"]
+print(json.dumps({
+    "import_s": imported - start,
+    "model_load_s": loaded - imported,
+    "first_prediction_s": predicted - loaded,
+    "peak_rss_mb_after_load": load_peak_rss_kb / 1024,
+    "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "heavy_modules_loaded": [name for name in heavy_modules if name in sys.modules],
+}))
+"""
+
+
+def benchmark_startup(args) -> dict:
+    """
+    Cold start to first prediction of DocumentProcessor, each run in a new Python process, with peak resident
+    memory (Linux ru_maxrss). Pass a .ckpt or an inference artifact directory to compare the two loaders.
+    """
+    runs = []
+    for _ in range(args.repeats):
+        start = time.perf_counter()
+        completed = subprocess.run(
+            [sys.executable, "-c", _STARTUP_SCRIPT, args.checkpoint_path, args.backend,
+             "1" if args.quantize else "0", args.text],
+            cwd=Path(__file__).resolve().parent, capture_output=True, text=True, check=True,
+        )
+        run = json.loads(completed.stdout.strip().splitlines()[-1])
+        run["total_s"] = time.perf_counter() - start
+        runs.append(run)
+
+    report = {"backend": args.backend, "quantize": args.quantize, "runs": runs}
+    for key in ("import_s", "model_load_s", "first_prediction_s", "total_s", "peak_rss_mb_after_load", "peak_rss_mb"):
+        report[f"median_{key}"] = statistics.median(run[key] for run in runs)
+    return report
+
+
+def benchmark_tokenizer_parity(args) -> dict:
+    """
+    RobertaTokenizer (pure Python, one encode_plus per text, as before) vs RobertaTokenizerFast (one batched call)
+    on the cleaned corpus: input ids must be identical, both truncated to max_token_len as the model sees them
+    and in full as sliding windows and token-aware chunking see them. Also reports the encoding time of both.
+    """
+    import pandas as pd
+    from transformers import RobertaTokenizer, RobertaTokenizerFast
+
+    texts = [str(text) for text in pd.read_csv(args.dataset_path).text]
+    if args.max_texts:
+        texts = texts[:args.max_texts]
+    slow_tokenizer = RobertaTokenizer.from_pretrained(args.model_name)
+    fast_tokenizer = RobertaTokenizerFast.from_pretrained(args.model_name)
+
+    report = {"texts": len(texts)}
+    for name, truncation in (("truncated", {"max_length": args.max_token_len, "truncation": True}),
+                             ("full", {"verbose": False})):
+        start = time.perf_counter()
+        slow_ids = [slow_tokenizer.encode_plus(text, add_special_tokens=True, **truncation)["input_ids"]
+                    for text in texts]
+        slow_s = time.perf_counter() - start
+        start = time.perf_counter()
+        fast_ids = fast_tokenizer(texts, add_special_tokens=True, **truncation)["input_ids"]
+        fast_s = time.perf_counter() - start
+
+        mismatches = [idx for idx, (slow, fast) in enumerate(zip(slow_ids, fast_ids)) if slow != fast]
+        report[name] = {
+            "mismatches": len(mismatches),
+            "first_mismatch": texts[mismatches[0]] if mismatches else None,
+            "slow_seconds": slow_s,
+            "fast_seconds": fast_s,
+            "speedup": slow_s / fast_s if fast_s else 0.0,
+        }
+    report["identical"] = report["truncated"]["mismatches"] == 0 and report["full"]["mismatches"] == 0
+    report["passed"] = report["identical"]
+    return report
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Accuracy/latency benchmarks for the inference paths.")
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--output", type=str, default=None, help="Optional path to write the report as JSON.")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    quantization_parser = subparsers.add_parser(
+        "quantization", parents=[common],
+        help="fp32 vs dynamic INT8: accuracy, agreement and latency on the test split."
+    )
+    quantization_parser.add_argument("--checkpoint_path", type=str, required=True, help="Path to the trained model .ckpt file.")
+    quantization_parser.add_argument("--dataset_path", type=str, required=True, help="Cleaned .csv used for training.")
+    quantization_parser.add_argument("--batch_size", type=int, default=32)
+    quantization_parser.add_argument("--threads", type=int, default=torch.get_num_threads(), help="torch CPU threads.")
+    quantization_parser.add_argument("--max_batches", type=int, default=None, help="Limit the number of test batches.")
+    quantization_parser.set_defaults(run=benchmark_quantization)
+
+    onnx_parser = subparsers.add_parser(
+        "onnx", parents=[common],
+        help="PyTorch vs ONNX Runtime: logit parity and latency/throughput on chunks of a text file."
+    )
+    onnx_parser.add_argument("--checkpoint_path", type=str, required=True, help="Path to the trained model .ckpt file.")
+    onnx_parser.add_argument("--onnx_dir", type=str, required=True, help="Export directory written by onnx_backend.py.")
+    onnx_parser.add_argument("--input_file", type=str, required=True, help="Text file to chunk into model inputs.")
+    onnx_parser.add_argument("--batch_size", type=int, default=16)
+    onnx_parser.add_argument("--max_chunks", type=int, default=512, help="Limit the number of chunks.")
+    onnx_parser.add_argument("--repeats", type=int, default=3, help="Timed passes over all batches.")
+    onnx_parser.add_argument("--tolerance", type=float, default=1e-3, help="Max abs logit difference considered equal.")
+    onnx_parser.add_argument("--threads", type=int, default=torch.get_num_threads(), help="CPU threads for both backends.")
+    onnx_parser.set_defaults(run=benchmark_onnx)
+
+    answer_filter_parser = subparsers.add_parser(
+        "answer_filter", parents=[common],
+        help="ROAST AnswerFilter: speed of the interval index against the pairwise loop."
+    )
+    answer_filter_parser.add_argument("--candidates", type=int, nargs="+", default=[80, 400, 2000],
+                                      help="Candidate counts to time.")
+    answer_filter_parser.add_argument("--repeats", type=int, default=5, help="Timed runs per candidate count.")
+    answer_filter_parser.add_argument("--seed", type=int, default=42)
+    answer_filter_parser.set_defaults(run=benchmark_answer_filter)
+
+    startup_parser = subparsers.add_parser(
+        "startup", parents=[common],
+        help="Cold-start time to the first prediction: imports, model load and first forward pass."
+    )
+    startup_parser.add_argument("--checkpoint_path", type=str, required=True,
+                                help="Path to the .ckpt file, an inference artifact directory, or the ONNX export "
+                                     "directory with --backend onnx.")
+    startup_parser.add_argument("--backend", type=str, choices=["torch", "onnx"], default="torch")
+    startup_parser.add_argument("--quantize", action="store_true", help="Use the dynamic INT8 model.")
+    startup_parser.add_argument("--text", type=str, default="The legions marched through the burning city.",
+                                help="Text of the first prediction.")
+    startup_parser.add_argument("--repeats", type=int, default=3, help="Number of cold starts.")
+    startup_parser.set_defaults(run=benchmark_startup)
+
+    tokenizer_parser = subparsers.add_parser(
+        "tokenizer_parity", parents=[common],
+        help="Slow vs fast RoBERTa tokenizer: identical input ids on the cleaned corpus, and encoding speed."
+    )
+    tokenizer_parser.add_argument("--dataset_path", type=str, required=True, help="Cleaned .csv used for training.")
+    tokenizer_parser.add_argument("--model_name", type=str, default="roberta-base")
+    tokenizer_parser.add_argument("--max_token_len", type=int, default=128)
+    tokenizer_parser.add_argument("--max_texts", type=int, default=None, help="Limit the number of texts compared.")
+    tokenizer_parser.set_defaults(run=benchmark_tokenizer_parity)
+
+    args = parser.parse_args()
+
+    report = args.run(args)
+    print(json.dumps(report, indent=4))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=4)
+    # Reports of parity checks carry "passed"; a failed check fails the run instead of only printing a number
+    if report.get("passed") is False:
+        sys.exit(1)
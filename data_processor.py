@@ -1,8 +1,40 @@
+import hashlib
+import os
 import pandas as pd
-import re
 import random
-import matplotlib.pyplot as plt
-import seaborn as sns
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+
+from text_cleaning import clean_text, clean_texts
+
+OUTPUT_COLUMNS = ['text', 'sense_class_name', 'sense_class_id', 'age_class_name', 'age_class_id']
+
+
+def _text_digest(text):
+    """
+    A compact 64-bit key for duplicate detection in the streaming pipeline.
+    Missing texts share one key, as drop_duplicates treats NaN values as equal.
+    """
+    raw = text if isinstance(text, str) else "\0<missing>"
+    return int.from_bytes(hashlib.blake2b(raw.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def _clean_and_filter_chunk(df, min_word_count, sense_id_to_name, age_id_to_name):
+    """
+    Steps 3-7 of DataProcessor.run_pipeline for one chunk; runs in a worker process of the streaming pipeline.
+    Returns the cleaned chunk and the number of rows dropped as too short.
+    """
+    df = df.copy()
+    df['text'] = clean_texts(df['text'])
+    df['text'] = df['text'].apply(DataProcessor._randomly_truncate_start)
+    word_counts = df['text'].apply(lambda x: len(x.split()))
+    rows_before_length_filter = len(df)
+    df = df[word_counts >= min_word_count].copy()
+    short_texts_removed = rows_before_length_filter - len(df)
+    df['sense_class_name'] = df['sense_class_id'].map(sense_id_to_name)
+    df['age_class_name'] = df['age_class_id'].map(age_id_to_name)
+    df = df.dropna(subset=['sense_class_name', 'age_class_name'])
+    return df[OUTPUT_COLUMNS], short_texts_removed
 
 
 class DataProcessor:
@@ -36,35 +68,9 @@ class DataProcessor:
         - Removes special characters, keeping essential punctuation.
         - Normalizes whitespace.
         This is a static method, so it can be called directly: DataProcessor._clean_text(your_text)
+        The work is done by the compiled engine in text_cleaning.clean_text, which produces identical output.
         """
-        if not isinstance(text, str):
-            return ""
-        text = text.lower()
-        # Remove URLs
-        text = re.sub(r'https?://\S+|www\.\S+', '', text)
-        # Remove mentions and hashtags
-        text = re.sub(r'@\w+|#\w+', '', text)
-
-        # --- NEW: Remove Markdown syntax ---
-        # Remove images and links, keeping the alt/link text
-        text = re.sub(r'!\[(.*?)\]\(.*?\)', r'\1', text)
-        text = re.sub(r'\[(.*?)\]\(.*?\)', r'\1', text)
-        # Remove headers
-        text = re.sub(r'^\s*#{1,6}\s+', '', text, flags=re.MULTILINE)
-        # Remove blockquotes
-        text = re.sub(r'^\s*>\s+', '', text, flags=re.MULTILINE)
-        # Remove horizontal rules
-        text = re.sub(r'^\s*[-\*_]{3,}\s*$', '', text, flags=re.MULTILINE)
-        # Remove bold, italic, strikethrough, and inline code markers
-        text = re.sub(r'(\*\*|__|\*|_|~~|`)', '', text)
-        # --- END NEW ---
-
-        # Remove non-alphanumeric characters, but keep spaces and basic punctuation
-        # This will also clean up any leftover markdown characters like `[` or `]`
-        text = re.sub(r'[^\w\s\'-]', '', text)
-        # Normalize whitespace to a single space
-        text = re.sub(r'\s+', ' ', text).strip()
-        return text
+        return clean_text(text)
 
     @staticmethod
     def _randomly_truncate_start(text, max_words_to_remove=10):
@@ -90,6 +96,19 @@ class DataProcessor:
         }
         print(f"Collected statistics for stage: '{stage}'")
 
+    def _accumulate_stats(self, df, stage):
+        """
+        Running-aggregate version of _collect_stats, adding one chunk to the statistics of a stage.
+        """
+        stats = self.stats.setdefault(stage, {
+            'total_samples': 0,
+            'sense_distribution': pd.Series(dtype='int64'),
+            'age_distribution': pd.Series(dtype='int64'),
+        })
+        stats['total_samples'] += len(df)
+        for column, key in (('sense_class_id', 'sense_distribution'), ('age_class_id', 'age_distribution')):
+            stats[key] = stats[key].add(df[column].value_counts(), fill_value=0).astype('int64').sort_index()
+
     def run_pipeline(self, input_filepath, output_filepath, min_word_count=10):
         """
         Executes the full preprocessing pipeline.
@@ -136,7 +155,7 @@ class DataProcessor:
 
         # 3. Apply basic text cleaning
         print("Applying text cleaning...")
-        df['text'] = df['text'].apply(self._clean_text)
+        df['text'] = clean_texts(df['text'])
 
         # 4. Apply random start truncation (for training data augmentation)
         print("Applying random start truncation...")
@@ -170,6 +189,95 @@ class DataProcessor:
         print("Pipeline finished successfully.")
         return df_cleaned
 
+    def run_pipeline_streaming(self, input_filepath, output_filepath, min_word_count=10, chunksize=50_000,
+                               n_workers=None):
+        """
+        Memory-bounded variant of run_pipeline for inputs that do not fit comfortably in memory.
+
+        The CSV is read twice in chunks. The first pass counts a 64-bit digest of every text, so rows whose
+        text occurs more than once anywhere in the file are dropped (drop_duplicates(keep=False) semantics).
+        The second pass drops those rows, cleans/truncates/filters the chunks across a process pool and
+        appends each result to the output CSV as soon as it is ready. Statistics are kept as running aggregates.
+
+        Args:
+            input_filepath (str): Path to the input CSV file.
+            output_filepath (str): Path to save the cleaned CSV file.
+            min_word_count (int): Minimum number of words a text must have to be kept.
+            chunksize (int): Number of rows read per chunk.
+            n_workers (int): Size of the process pool (defaults to the number of CPUs).
+
+        Returns:
+            int: Number of rows written, or None if the input could not be processed.
+        """
+        print(f"Starting streaming pipeline with input: {input_filepath}")
+        required_columns = ['text', 'sense_class_id', 'age_class_id']
+        try:
+            columns = pd.read_csv(input_filepath, nrows=0).columns.tolist()
+        except FileNotFoundError:
+            print(f"Error: Input file not found at {input_filepath}")
+            return None
+
+        missing_columns = [col for col in required_columns if col not in columns]
+        if missing_columns:
+            print(f"\n--- ERROR: Missing required columns in the input CSV file. ---")
+            print(f"Missing column(s): {missing_columns}")
+            print(f"Please ensure your CSV file contains the columns: {required_columns}")
+            print("-----------------------------------------------------------------")
+            return None
+
+        def read_chunks():
+            return pd.read_csv(input_filepath, usecols=required_columns, dtype={'text': str}, chunksize=chunksize)
+
+        # 1. First pass: initial statistics and duplicate detection
+        for stage in ('initial', 'final'):
+            self.stats.pop(stage, None)
+        text_counts = Counter()
+        for chunk in read_chunks():
+            self._accumulate_stats(chunk, 'initial')
+            text_counts.update(_text_digest(text) for text in chunk['text'])
+        duplicate_digests = {digest for digest, count in text_counts.items() if count > 1}
+        del text_counts
+        print(f"Collected statistics for stage: 'initial' ({self.stats['initial']['total_samples']} rows)")
+
+        # 2. Second pass: drop duplicates, then clean and filter chunks in parallel
+        n_workers = n_workers or os.cpu_count() or 1
+        max_in_flight = 2 * n_workers
+        self.stats['duplicates_removed'] = 0
+        self.stats['short_texts_removed'] = 0
+        rows_written = 0
+        pd.DataFrame(columns=OUTPUT_COLUMNS).to_csv(output_filepath, index=False, encoding='utf-8')
+
+        def write_result(future):
+            nonlocal rows_written
+            cleaned_chunk, short_texts_removed = future.result()
+            self.stats['short_texts_removed'] += short_texts_removed
+            self._accumulate_stats(cleaned_chunk, 'final')
+            cleaned_chunk.to_csv(output_filepath, mode='a', header=False, index=False, encoding='utf-8')
+            rows_written += len(cleaned_chunk)
+
+        # Workers are reseeded from os.urandom, otherwise forked workers would share one truncation sequence
+        with ProcessPoolExecutor(max_workers=n_workers, initializer=random.seed) as executor:
+            pending = deque()
+            for chunk in read_chunks():
+                is_unique = [_text_digest(text) not in duplicate_digests for text in chunk['text']]
+                unique_chunk = chunk[is_unique]
+                self.stats['duplicates_removed'] += len(chunk) - len(unique_chunk)
+                pending.append(executor.submit(_clean_and_filter_chunk, unique_chunk, min_word_count,
+                                               self.sense_id_to_name, self.age_id_to_name))
+                # Bound the number of chunks held in memory at once
+                if len(pending) >= max_in_flight:
+                    write_result(pending.popleft())
+            while pending:
+                write_result(pending.popleft())
+
+        self.stats.setdefault('final', {'total_samples': 0, 'sense_distribution': pd.Series(dtype='int64'),
+                                        'age_distribution': pd.Series(dtype='int64')})
+        print(f"Removed {self.stats['duplicates_removed']} rows due to duplicate text.")
+        print(f"Removed {self.stats['short_texts_removed']} rows with less than {min_word_count} words.")
+        print(f"Wrote {rows_written} cleaned rows to {output_filepath}")
+        print("Streaming pipeline finished successfully.")
+        return rows_written
+
     def display_statistics(self):
         """
         Prints a summary of the preprocessing statistics and generates plots.
@@ -191,6 +299,10 @@ class DataProcessor:
             print("\nStatistics not available for comparison.")
             return
 
+        # Plotting libraries are only needed here, so they are not imported with the module
+        import matplotlib.pyplot as plt
+        import seaborn as sns
+
         # Plotting distributions
         fig, axes = plt.subplots(2, 2, figsize=(18, 14))
         fig.suptitle('Class Distribution Comparison', fontsize=18)
@@ -255,17 +367,25 @@ if __name__ == '__main__':
     # For example: INPUT_CSV = './data/raw_dataset.csv'
     INPUT_CSV = 'data/dataset3.csv'
     OUTPUT_CSV = 'data/cleaned_data3.csv'
+    # Set to True for inputs too large to load at once; chunks are cleaned across a process pool.
+    STREAMING = False
+    CHUNKSIZE = 50_000
 
     # Initialize and run the processor
     processor = DataProcessor(sense_classes=SENSE_CLASSES, age_classes=AGE_CLASSES)
-    # Make sure to replace the path in the line below with your actual file path
-    cleaned_df = processor.run_pipeline(input_filepath=INPUT_CSV, output_filepath=OUTPUT_CSV)
-
-    # Display the final statistics and visualizations
-    if cleaned_df is not None:
-        processor.display_statistics()
-        print(f"\n--- First 5 rows of cleaned data in {OUTPUT_CSV} ---")
-        print(cleaned_df.head())
-        print("\n--- End of script ---")
-
-
+    if STREAMING:
+        rows_written = processor.run_pipeline_streaming(input_filepath=INPUT_CSV, output_filepath=OUTPUT_CSV,
+                                                        chunksize=CHUNKSIZE)
+        if rows_written is not None:
+            processor.display_statistics()
+            print("\n--- End of script ---")
+    else:
+        # Make sure to replace the path in the line below with your actual file path
+        cleaned_df = processor.run_pipeline(input_filepath=INPUT_CSV, output_filepath=OUTPUT_CSV)
+
+        # Display the final statistics and visualizations
+        if cleaned_df is not None:
+            processor.display_statistics()
+            print(f"\n--- First 5 rows of cleaned data in {OUTPUT_CSV} ---")
+            print(cleaned_df.head())
+            print("\n--- End of script ---")
@@ -1,67 +1,369 @@
+import json
+import math
+import random
+from pathlib import Path
+
+import numpy as np
 import pandas as pd
 import torch
-from torch.utils.data import Dataset, DataLoader
+from torch.utils.data import Dataset, DataLoader, DistributedSampler, Sampler
 import pytorch_lightning as pl
-from transformers import RobertaTokenizer
+from transformers import RobertaTokenizerFast
 from sklearn.model_selection import train_test_split
 
 
 class TextDataset(Dataset):
     """
     Custom PyTorch Dataset for loading text and multi-task labels.
+    The whole split is encoded once, in a single batched call of the fast tokenizer, when the dataset is built;
+    __getitem__ only pads and wraps the stored token ids.
     """
 
-    def __init__(self, data: pd.DataFrame, tokenizer: RobertaTokenizer, max_token_len: int):
+    def __init__(self, data: pd.DataFrame, tokenizer: RobertaTokenizerFast, max_token_len: int,
+                 pad_to_max_length: bool = True):
         self.tokenizer = tokenizer
         self.data = data
         self.max_token_len = max_token_len
+        # With dynamic padding the collate function pads each batch, so samples are returned unpadded
+        self.pad_to_max_length = pad_to_max_length
+        self.texts = [str(text) for text in data.text]
+        self.input_ids = tokenizer(
+            self.texts,
+            add_special_tokens=True,
+            max_length=max_token_len,
+            return_token_type_ids=False,
+            return_attention_mask=False,
+            truncation=True,
+        )["input_ids"]
+        self.sense_labels = data.sense_class_id.tolist()
+        self.age_labels = data.age_class_id.tolist()
 
     def __len__(self):
         return len(self.data)
 
+    def lengths(self) -> list[int]:
+        """Token length of every sample (after truncation)."""
+        return [len(ids) for ids in self.input_ids]
+
     def __getitem__(self, index: int):
-        item = self.data.iloc[index]
-        text = str(item.text)
-        sense_label = item.sense_class_id
-        age_label = item.age_class_id
+        token_ids = self.input_ids[index]
+        # Right padding with the pad token, as encode_plus(padding="max_length") does for RoBERTa
+        num_padding = self.max_token_len - len(token_ids) if self.pad_to_max_length else 0
 
-        encoding = self.tokenizer.encode_plus(
-            text,
-            add_special_tokens=True,
-            max_length=self.max_token_len,
-            return_token_type_ids=False,
-            padding="max_length",
-            truncation=True,
-            return_attention_mask=True,
-            return_tensors='pt',
+        return dict(
+            text=self.texts[index],
+            input_ids=torch.tensor(token_ids + [self.tokenizer.pad_token_id] * num_padding, dtype=torch.long),
+            attention_mask=torch.tensor([1] * len(token_ids) + [0] * num_padding, dtype=torch.long),
+            sense_labels=torch.tensor(self.sense_labels[index], dtype=torch.long),
+            age_labels=torch.tensor(self.age_labels[index], dtype=torch.long)
         )
 
+
+class PretokenizedTextDataset(Dataset):
+    """
+    Dataset over a shard written by `pretokenize_split`.
+    The arrays are memory-mapped lazily in each worker process, so nothing is tokenized or copied
+    up front and workers share the pages through the OS cache.
+    """
+
+    def __init__(self, shard_dir: str):
+        self.shard_dir = Path(shard_dir)
+        with open(self.shard_dir / "meta.json", encoding="utf-8") as f:
+            self.meta = json.load(f)
+        self.max_token_len = self.meta["max_token_len"]
+        self._arrays = None
+
+    def _load_arrays(self):
+        # Opened on first access rather than in __init__: pickling a memmap into DataLoader workers would
+        # copy the whole array. Copy-on-write mode gives writable views without reading anything eagerly.
+        self._arrays = {
+            name: np.load(self.shard_dir / f"{name}.npy", mmap_mode="c")
+            for name in ("input_ids", "lengths", "sense_labels", "age_labels")
+        }
+        return self._arrays
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_arrays"] = None
+        return state
+
+    def __len__(self):
+        return self.meta["num_samples"]
+
+    def lengths(self) -> list[int]:
+        return np.load(self.shard_dir / "lengths.npy").tolist()
+
+    def __getitem__(self, index: int):
+        arrays = self._arrays or self._load_arrays()
+        length = int(arrays["lengths"][index])
+        input_ids = torch.from_numpy(arrays["input_ids"][index])
+        attention_mask = (torch.arange(self.max_token_len) < length).long()
+
         return dict(
-            text=text,
-            input_ids=encoding["input_ids"].flatten(),
-            attention_mask=encoding["attention_mask"].flatten(),
-            sense_labels=torch.tensor(sense_label, dtype=torch.long),
-            age_labels=torch.tensor(age_label, dtype=torch.long)
+            input_ids=input_ids,
+            attention_mask=attention_mask,
+            sense_labels=torch.tensor(arrays["sense_labels"][index], dtype=torch.long),
+            age_labels=torch.tensor(arrays["age_labels"][index], dtype=torch.long)
+        )
+
+
+class DynamicPaddingCollator:
+    """
+    Collate function that pads each batch only to its longest sequence instead of max_token_len.
+    Accepts samples that are unpadded or right-padded; the attention mask gives the real length.
+    """
+
+    def __init__(self, pad_token_id: int):
+        self.pad_token_id = pad_token_id
+
+    def __call__(self, samples: list[dict]) -> dict:
+        lengths = [int(sample["attention_mask"].sum()) for sample in samples]
+        max_len = max(lengths)
+        input_ids = torch.full((len(samples), max_len), self.pad_token_id, dtype=torch.long)
+        attention_mask = torch.zeros((len(samples), max_len), dtype=torch.long)
+        for row, (sample, length) in enumerate(zip(samples, lengths)):
+            input_ids[row, :length] = sample["input_ids"][:length]
+            attention_mask[row, :length] = 1
+
+        batch = dict(
+            input_ids=input_ids,
+            attention_mask=attention_mask,
+            sense_labels=torch.stack([sample["sense_labels"] for sample in samples]),
+            age_labels=torch.stack([sample["age_labels"] for sample in samples])
         )
+        if "text" in samples[0]:
+            batch["text"] = [sample["text"] for sample in samples]
+        return batch
+
+
+class _EpochSampler(Sampler):
+    """
+    The `.sampler` of a LengthGroupedBatchSampler. For a DataLoader built with batch_sampler=..., Lightning only
+    calls set_epoch on dataloader.sampler and dataloader.batch_sampler.sampler, never on the batch sampler itself,
+    so this object receives the call and forwards it. Iterating it yields the indices of the current batches.
+    """
+
+    def __init__(self, batch_sampler: "LengthGroupedBatchSampler"):
+        self.batch_sampler = batch_sampler
+
+    def set_epoch(self, epoch: int):
+        self.batch_sampler.set_epoch(epoch)
+
+    def __iter__(self):
+        return (idx for batch in self.batch_sampler for idx in batch)
+
+    def __len__(self):
+        return sum(len(batch) for batch in self.batch_sampler._batches())
+
+
+class LengthGroupedBatchSampler(Sampler):
+    """
+    Yields batches of indices whose samples have similar token lengths.
+    With shuffle, indices are shuffled, split into buckets of `batch_size * bucket_size_multiplier`,
+    sorted by length inside each bucket and cut into batches; the batch order is then shuffled again.
+    Without shuffle, all indices are simply sorted by length (deterministic, for evaluation).
+    For distributed training, every process builds the same batch list (same seed and epoch) and takes every
+    num_replicas-th batch from its rank on; the list is padded by repeating batches from its start so that
+    all processes run the same number of steps.
+    """
+
+    def __init__(self, lengths: list[int], batch_size: int, shuffle: bool = True, bucket_size_multiplier: int = 50,
+                 seed: int = 0, num_replicas: int = 1, rank: int = 0):
+        if not 0 <= rank < num_replicas:
+            raise ValueError(f"rank must be in [0, {num_replicas}), got {rank}.")
+        self.lengths = lengths
+        self.batch_size = batch_size
+        self.shuffle = shuffle
+        self.bucket_size = batch_size * bucket_size_multiplier
+        self.seed = seed
+        self.epoch = 0
+        self.num_replicas = num_replicas
+        self.rank = rank
+        # Where Lightning looks for set_epoch (see _EpochSampler)
+        self.sampler = _EpochSampler(self)
+
+    def set_epoch(self, epoch: int):
+        self.epoch = epoch
+
+    def _all_batches(self) -> list[list[int]]:
+        indices = list(range(len(self.lengths)))
+        if not self.shuffle:
+            indices.sort(key=lambda idx: self.lengths[idx])
+            return [indices[start:start + self.batch_size] for start in range(0, len(indices), self.batch_size)]
+
+        rng = random.Random(self.seed + self.epoch)
+        rng.shuffle(indices)
+        batches = []
+        for bucket_start in range(0, len(indices), self.bucket_size):
+            bucket = sorted(indices[bucket_start:bucket_start + self.bucket_size], key=lambda idx: self.lengths[idx])
+            batches.extend(bucket[start:start + self.batch_size] for start in range(0, len(bucket), self.batch_size))
+        rng.shuffle(batches)
+        return batches
+
+    def _batches(self) -> list[list[int]]:
+        """The batches of this process's rank."""
+        batches = self._all_batches()
+        if self.num_replicas == 1 or not batches:
+            return batches
+        num_padding = len(self) * self.num_replicas - len(batches)
+        batches += (batches * math.ceil(num_padding / len(batches)))[:num_padding]
+        return batches[self.rank::self.num_replicas]
+
+    def __iter__(self):
+        # Lightning calls set_epoch through self.sampler before every epoch, which reshuffles the buckets
+        return iter(self._batches())
+
+    def __len__(self):
+        num_batches = (len(self.lengths) + self.batch_size - 1) // self.batch_size
+        return (num_batches + self.num_replicas - 1) // self.num_replicas
+
+
+def padding_waste_ratio(lengths: list[int], batches: list[list[int]], pad_to: int = None) -> float:
+    """
+    Fraction of token positions in the given batches that are padding.
+    With `pad_to`, every sequence is assumed padded to that fixed length; otherwise each batch is padded
+    to its own longest sequence.
+    """
+    total_positions, real_tokens = 0, 0
+    for batch in batches:
+        batch_lengths = [lengths[idx] for idx in batch]
+        total_positions += len(batch) * (pad_to or max(batch_lengths))
+        real_tokens += sum(batch_lengths)
+    return 1.0 - real_tokens / total_positions if total_positions else 0.0
+
+
+def pretokenize_split(data: pd.DataFrame, tokenizer: RobertaTokenizerFast, max_token_len: int, shard_dir: str,
+                      config: dict = None):
+    """
+    Tokenizes a split once and writes it as memory-mappable .npy files:
+    input_ids (int64, padded to max_token_len), lengths, sense_labels, age_labels and a meta.json.
+    `config` (see TextDataModule.shard_config) is stored in meta.json, so stale shards can be detected.
+    """
+    shard_dir = Path(shard_dir)
+    shard_dir.mkdir(parents=True, exist_ok=True)
+
+    encodings = tokenizer(
+        [str(text) for text in data.text],
+        add_special_tokens=True,
+        max_length=max_token_len,
+        return_token_type_ids=False,
+        return_attention_mask=False,
+        truncation=True,
+    )
+    token_ids = encodings["input_ids"]
+
+    input_ids = np.full((len(token_ids), max_token_len), tokenizer.pad_token_id, dtype=np.int64)
+    lengths = np.zeros(len(token_ids), dtype=np.int32)
+    for row, ids in enumerate(token_ids):
+        input_ids[row, :len(ids)] = ids
+        lengths[row] = len(ids)
+
+    np.save(shard_dir / "input_ids.npy", input_ids)
+    np.save(shard_dir / "lengths.npy", lengths)
+    np.save(shard_dir / "sense_labels.npy", data.sense_class_id.to_numpy(dtype=np.int64))
+    np.save(shard_dir / "age_labels.npy", data.age_class_id.to_numpy(dtype=np.int64))
+    with open(shard_dir / "meta.json", "w", encoding="utf-8") as f:
+        json.dump({"num_samples": len(token_ids), "max_token_len": max_token_len,
+                   "pad_token_id": tokenizer.pad_token_id, "config": config}, f, indent=4)
 
 
 class TextDataModule(pl.LightningDataModule):
     """
     PyTorch Lightning DataModule to handle dataset loading and splitting.
     This version uses stratified splitting to maintain class distribution.
+    When `pretokenized_dir` holds shards written by `pretokenize`, the splits are read from there
+    instead of being tokenized from the CSV on every epoch. prepare_data writes them if needed.
+    Under distributed training (a Trainer with world_size > 1) every dataloader is sharded across the
+    processes: by a DistributedSampler, or by LengthGroupedBatchSampler itself with length grouping.
+    The Trainer must then be created with use_distributed_sampler=False.
     """
 
-    def __init__(self, data_path: str, batch_size: int, max_token_len: int, model_name: str, random_state: int):
+    SPLITS = ("train", "val", "test")
+
+    def __init__(self, data_path: str, batch_size: int, max_token_len: int, model_name: str, random_state: int,
+                 pretokenized_dir: str = None, dynamic_padding: bool = False, group_by_length: bool = False,
+                 num_workers: int = 4):
         super().__init__()
+        self.num_workers = num_workers
         self.data_path = data_path
         self.batch_size = batch_size
         self.max_token_len = max_token_len
         self.random_state = random_state
-        self.tokenizer = RobertaTokenizer.from_pretrained(model_name)
+        self.pretokenized_dir = Path(pretokenized_dir) if pretokenized_dir else None
+        # Length grouping only pays off when batches are padded dynamically, so it implies it
+        self.group_by_length = group_by_length
+        self.dynamic_padding = dynamic_padding or group_by_length
+        self.model_name = model_name
+        self.tokenizer = RobertaTokenizerFast.from_pretrained(model_name)
         self.train_df, self.val_df, self.test_df = None, None, None
+        self._split_lengths = {}
+        self._shards_valid = None
+        # prepare_data writes the shards once, on global rank 0, for all processes
+        self.prepare_data_per_node = False
+
+    def shard_config(self) -> dict:
+        """Everything the contents of the pre-tokenized shards depend on, including the identity of the source CSV."""
+        source = Path(self.data_path) if self.data_path else None
+        source_stat = source.stat() if source is not None and source.exists() else None
+        return {
+            "max_token_len": self.max_token_len,
+            "tokenizer": self.model_name,
+            "random_state": self.random_state,
+            "source": {
+                "path": str(source.resolve()) if source is not None else None,
+                "size": source_stat.st_size if source_stat else None,
+                "mtime_ns": source_stat.st_mtime_ns if source_stat else None,
+            },
+        }
+
+    def _stale_shard_fields(self) -> list[str]:
+        """Config fields for which a shard's meta.json disagrees with this module's configuration."""
+        expected, stale = self.shard_config(), set()
+        for split in self.SPLITS:
+            with open(self.pretokenized_dir / split / "meta.json", encoding="utf-8") as f:
+                recorded = json.load(f).get("config") or {}
+            stale.update(key for key, value in expected.items() if recorded.get(key) != value)
+        return sorted(stale)
+
+    def has_pretokenized_shards(self) -> bool:
+        """True if shards of every split exist and were written with the current configuration and source data."""
+        if self._shards_valid is None:
+            exist = self.pretokenized_dir is not None and all(
+                (self.pretokenized_dir / split / "meta.json").exists() for split in self.SPLITS
+            )
+            stale_fields = self._stale_shard_fields() if exist else []
+            if stale_fields:
+                print(f"Warning: pre-tokenized shards in {self.pretokenized_dir} are stale "
+                      f"(changed: {', '.join(stale_fields)}); they will not be used.")
+            self._shards_valid = exist and not stale_fields
+        return self._shards_valid
+
+    def pretokenize(self):
+        """One-time preprocessing: splits the CSV as `setup` does and writes one shard per split."""
+        if self.train_df is None:
+            self._setup_from_csv()
+        config = self.shard_config()
+        for split, df in zip(self.SPLITS, (self.train_df, self.val_df, self.test_df)):
+            pretokenize_split(df, self.tokenizer, self.max_token_len, self.pretokenized_dir / split, config=config)
+        self._shards_valid = None
+        print(f"Pre-tokenized shards written to {self.pretokenized_dir}")
+
+    def prepare_data(self):
+        """Writes the pre-tokenized shards when `pretokenized_dir` is set and they are missing or stale."""
+        if self.pretokenized_dir is not None and not self.has_pretokenized_shards():
+            print("Pre-tokenizing dataset...")
+            self.pretokenize()
 
     def setup(self, stage=None):
-        """Load data and perform stratified splitting."""
+        """Load data and perform stratified splitting, or open the pre-tokenized shards if available."""
+        # Other processes may have written the shards since the last check (see prepare_data)
+        self._shards_valid = None
+        if self.has_pretokenized_shards():
+            print(f"Using pre-tokenized shards from {self.pretokenized_dir}")
+            return
+        self._setup_from_csv()
+
+    def _setup_from_csv(self):
         try:
             df = pd.read_csv(self.data_path)
         except FileNotFoundError:
@@ -103,14 +405,76 @@ class TextDataModule(pl.LightningDataModule):
         print(
             f"Train samples: {len(self.train_df)}, Val samples: {len(self.val_df)}, Test samples: {len(self.test_df)}")
 
+    def _build_dataset(self, split: str, df: pd.DataFrame):
+        if self.has_pretokenized_shards():
+            return PretokenizedTextDataset(self.pretokenized_dir / split)
+        return TextDataset(df, self.tokenizer, self.max_token_len, pad_to_max_length=not self.dynamic_padding)
+
+    def _lengths(self, split: str, dataset) -> list[int]:
+        if split not in self._split_lengths:
+            self._split_lengths[split] = dataset.lengths()
+        return self._split_lengths[split]
+
+    def _replicas(self) -> tuple[int, int]:
+        """(world size, rank) of the attached Trainer; (1, 0) outside of distributed training."""
+        trainer = self.trainer
+        if trainer is None or trainer.world_size <= 1:
+            return 1, 0
+        return trainer.world_size, trainer.global_rank
+
+    def train_batches_per_process(self, world_size: int = 1) -> int:
+        """Training batches each of `world_size` processes runs per epoch, sharded as _build_dataloader does."""
+        if self.has_pretokenized_shards():
+            num_samples = len(PretokenizedTextDataset(self.pretokenized_dir / "train"))
+        else:
+            num_samples = len(self.train_df)
+        if self.group_by_length:
+            # Whole batches are dealt out to the processes
+            return math.ceil(math.ceil(num_samples / self.batch_size) / world_size)
+        # DistributedSampler deals out samples, which each process then batches
+        return math.ceil(math.ceil(num_samples / world_size) / self.batch_size)
+
+    def _report_padding_waste(self, split: str, lengths: list[int], batches: list[list[int]]):
+        fixed = padding_waste_ratio(lengths, batches, pad_to=self.max_token_len)
+        dynamic = padding_waste_ratio(lengths, batches)
+        print(f"[{split}] padding waste: {fixed:.1%} padded to max_token_len -> {dynamic:.1%} with "
+              f"{'length-grouped' if self.group_by_length else 'dynamic'} padding")
+
+    def _build_dataloader(self, split: str, df: pd.DataFrame, shuffle: bool):
+        dataset = self._build_dataset(split, df)
+        num_replicas, rank = self._replicas()
+        loader_kwargs = dict(num_workers=self.num_workers, persistent_workers=self.num_workers > 0)
+        sampler = None
+        if num_replicas > 1:
+            # Lightning calls set_epoch on dataloader.sampler before every epoch, so the shuffle changes per epoch
+            sampler = DistributedSampler(dataset, num_replicas=num_replicas, rank=rank, shuffle=shuffle,
+                                         seed=self.random_state)
+        if not self.dynamic_padding:
+            return DataLoader(dataset, batch_size=self.batch_size, shuffle=shuffle and sampler is None,
+                              sampler=sampler, **loader_kwargs)
+
+        collate_fn = DynamicPaddingCollator(self.tokenizer.pad_token_id)
+        lengths = self._lengths(split, dataset)
+        if self.group_by_length:
+            batch_sampler = LengthGroupedBatchSampler(lengths, self.batch_size, shuffle=shuffle, seed=self.random_state,
+                                                      num_replicas=num_replicas, rank=rank)
+            self._report_padding_waste(split, lengths, batch_sampler._batches())
+            return DataLoader(dataset, batch_sampler=batch_sampler, collate_fn=collate_fn, **loader_kwargs)
+
+        # Estimate the waste of plain random batches with one representative shuffle
+        indices = list(sampler) if sampler is not None else list(range(len(lengths)))
+        if shuffle and sampler is None:
+            random.Random(self.random_state).shuffle(indices)
+        self._report_padding_waste(split, lengths, [indices[start:start + self.batch_size]
+                                                    for start in range(0, len(indices), self.batch_size)])
+        return DataLoader(dataset, batch_size=self.batch_size, shuffle=shuffle and sampler is None, sampler=sampler,
+                          collate_fn=collate_fn, **loader_kwargs)
+
     def train_dataloader(self):
-        dataset = TextDataset(self.train_df, self.tokenizer, self.max_token_len)
-        return DataLoader(dataset, batch_size=self.batch_size, shuffle=True, num_workers=4, persistent_workers=True)
+        return self._build_dataloader("train", self.train_df, shuffle=True)
 
     def val_dataloader(self):
-        dataset = TextDataset(self.val_df, self.tokenizer, self.max_token_len)
-        return DataLoader(dataset, batch_size=self.batch_size, num_workers=4, persistent_workers=True)
+        return self._build_dataloader("val", self.val_df, shuffle=False)
 
     def test_dataloader(self):
-        dataset = TextDataset(self.test_df, self.tokenizer, self.max_token_len)
-        return DataLoader(dataset, batch_size=self.batch_size, num_workers=4, persistent_workers=True)
+        return self._build_dataloader("test", self.test_df, shuffle=False)
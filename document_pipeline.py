@@ -0,0 +1,196 @@
+import argparse
+import json
+from pathlib import Path
+
+from tqdm import tqdm
+
+from process_document import DocumentProcessor, SENSE_CLASSES, AGE_CLASSES
+
+# Concepts looked up in every paragraph unless --concepts is given
+DEFAULT_CONCEPTS = ["dragon", "city", "spell", "potion", "sword", "ship", "starship", "robot", "car", "horse"]
+
+# concept -> class IDs of paragraphs in which the concept is not looked up.
+# Age IDs: 0 ancient, 1 neutral, 2 technology modern age (see AGE_CLASSES).
+DEFAULT_SKIP_RULES = {
+    "starship": {"skip_ages": [0]},
+    "robot": {"skip_ages": [0]},
+    "car": {"skip_ages": [0]},
+    "spell": {"skip_ages": [2]},
+    "potion": {"skip_ages": [2]},
+}
+
+
+def load_skip_rules(path: str = None) -> dict:
+    """
+    Reads skip rules from a JSON file of the form {"concept": {"skip_ages": [ids], "skip_senses": [ids]}}.
+    Without a path, DEFAULT_SKIP_RULES are used.
+    """
+    if not path:
+        return DEFAULT_SKIP_RULES
+    with open(path, 'r', encoding='utf-8') as f:
+        rules = json.load(f)
+    valid_senses, valid_ages = set(SENSE_CLASSES.values()), set(AGE_CLASSES.values())
+    for concept, rule in rules.items():
+        unknown = set(rule) - {"skip_ages", "skip_senses"}
+        if unknown:
+            raise ValueError(f"Unknown keys {sorted(unknown)} in skip rule for '{concept}'.")
+        if not set(rule.get("skip_senses", [])) <= valid_senses or not set(rule.get("skip_ages", [])) <= valid_ages:
+            raise ValueError(f"Skip rule for '{concept}' references unknown class IDs.")
+    return rules
+
+
+class DocumentPipeline:
+    """
+    Runs paragraph classification and entity extraction over a whole document and merges both into one result.
+    Paragraphs come from the processor's chunking, and the reader work of all (paragraph, concept) pairs
+    that survive the skip rules is batched across paragraphs and concepts.
+    """
+
+    def __init__(self, processor: DocumentProcessor, extractor, concepts: list[str], skip_rules: dict = None,
+                 pairs_per_reader_run: int = 64):
+        """
+        extractor is a ROAST.ExpertInstanceExtractor. pairs_per_reader_run bounds how many
+        (paragraph, concept) pairs share one batched reader run, and so the memory of a run.
+        """
+        self.processor = processor
+        self.extractor = extractor
+        self.concepts = concepts
+        self.skip_rules = DEFAULT_SKIP_RULES if skip_rules is None else skip_rules
+        self.pairs_per_reader_run = max(1, pairs_per_reader_run)
+
+    def _is_relevant(self, concept: str, paragraph_result: dict) -> bool:
+        rule = self.skip_rules.get(concept)
+        if not rule:
+            return True
+        return (paragraph_result["sense_prediction"]["class_id"] not in rule.get("skip_senses", [])
+                and paragraph_result["age_prediction"]["class_id"] not in rule.get("skip_ages", []))
+
+    @staticmethod
+    def _locate_entities(text: str, concept: str, instances: list) -> list[dict]:
+        """Turns (span, score) instances into entities with their character offset in the paragraph text."""
+        entities, lowered_text, used_positions = [], text.lower(), set()
+        for span, score in instances:
+            start_pos = lowered_text.find(span.lower())
+            # The same span can occur several times; each entity gets its own occurrence
+            while start_pos in used_positions:
+                start_pos = lowered_text.find(span.lower(), start_pos + 1)
+            if start_pos == -1:
+                continue
+            used_positions.add(start_pos)
+            entities.append({"type": concept, "sample": text[start_pos:start_pos + len(span)],
+                             "start_pos": start_pos, "score": score})
+        return sorted(entities, key=lambda entity: entity["start_pos"])
+
+    def process_text_content(self, text_content: str, title: str = "Untitled") -> dict:
+        """Classifies every paragraph, extracts the relevant concepts and returns the merged document."""
+        document = self.processor.process_text_content(text_content, title=title)
+        paragraphs = document["paragraphs"]
+
+        pairs = [
+            (paragraph_index, concept)
+            for paragraph_index, paragraph in enumerate(paragraphs)
+            for concept in self.concepts
+            if self._is_relevant(concept, paragraph)
+        ]
+        print(f"Extracting {len(pairs)} (paragraph, concept) pairs, "
+              f"{len(paragraphs) * len(self.concepts) - len(pairs)} skipped by rules.")
+
+        for paragraph in paragraphs:
+            paragraph["entities"] = []
+        for start in tqdm(range(0, len(pairs), self.pairs_per_reader_run), desc=f"Extracting entities for '{title}'"):
+            run_pairs = pairs[start:start + self.pairs_per_reader_run]
+            instances_per_pair = self.extractor.extract_jobs(
+                [(paragraphs[paragraph_index]["text"], concept) for paragraph_index, concept in run_pairs]
+            )
+            for (paragraph_index, concept), instances in zip(run_pairs, instances_per_pair):
+                paragraphs[paragraph_index]["entities"].extend(
+                    self._locate_entities(paragraphs[paragraph_index]["text"], concept, instances)
+                )
+
+        for paragraph in paragraphs:
+            paragraph["entities"].sort(key=lambda entity: entity["start_pos"])
+        print(f"Extraction cache stats: {self.extractor.cache_stats()}")
+        return document
+
+
+def warm_answer_cache(extractor, text_content: str, concepts: list[str], pairs_per_reader_run: int = 64) -> int:
+    """
+    Offline warm-up of the extractor's answer cache for a document: every concept of every paragraph, skip rules
+    ignored (they may change later), and no classification model needed. Returns the number of pairs.
+    """
+    paragraphs = DocumentProcessor._chunk_text(text_content)
+    pairs = [(paragraph, concept) for paragraph in paragraphs for concept in concepts]
+    print(f"Warming the answer cache for {len(paragraphs)} paragraphs x {len(concepts)} concepts.")
+    return extractor.warm_answer_cache(pairs, pairs_per_reader_run=pairs_per_reader_run)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description="Classify the paragraphs of a document and extract concept instances into one JSON file."
+    )
+    parser.add_argument("--checkpoint_path", type=str, default="checkpoints/best-checkpoint-epoch=02-val_loss=0.90.ckpt", help="Path to the trained model .ckpt file.")
+    parser.add_argument("--qa_model", type=str, default="QA_RoBERTA_SQUADv2", help="Extractive QA model used by ROAST.")
+    parser.add_argument("--input_file", type=str, required=True, help="Path to the input .txt file.")
+    parser.add_argument("--output_file", type=str, default=None, help="Path for the merged output .json file.")
+    parser.add_argument("--title", type=str, default=None, help="Document title (uses filename if not provided).")
+    parser.add_argument("--concepts", type=str, default=None,
+                        help=f"Comma-separated concepts to extract (default: {','.join(DEFAULT_CONCEPTS)}).")
+    parser.add_argument("--skip_rules", type=str, default=None,
+                        help="JSON file of per-concept skip rules; built-in defaults are used if omitted.")
+    parser.add_argument("--threshold", type=float, default=0.9,
+                        help="Confidence threshold to fallback to previous paragraph's prediction.")
+    parser.add_argument("--batch_size", type=int, default=16, help="Paragraphs per classification forward pass.")
+    parser.add_argument("--backend", type=str, choices=["torch", "onnx"], default="torch",
+                        help="Classification backend; with 'onnx', --checkpoint_path is an onnx_backend.py export directory.")
+    parser.add_argument("--reader_batch_size", type=int, default=32, help="Sequences per QA forward pass.")
+    parser.add_argument("--pairs_per_reader_run", type=int, default=64,
+                        help="(paragraph, concept) pairs batched into one reader run.")
+    parser.add_argument("--answer_cache_path", type=str, default=None,
+                        help="On-disk cache of raw reader answers (SQLite file); disabled if omitted.")
+    parser.add_argument("--answer_cache_max_entries", type=int, default=200_000,
+                        help="Maximum number of cached (paragraph, question) answers before LRU eviction.")
+    parser.add_argument("--warm_cache_only", action="store_true",
+                        help="Only fill the answer cache for every paragraph and concept; no classification or output.")
+    args = parser.parse_args()
+    if args.warm_cache_only and not args.answer_cache_path:
+        parser.error("--warm_cache_only requires --answer_cache_path.")
+    if not args.warm_cache_only and not args.output_file:
+        parser.error("--output_file is required unless --warm_cache_only is set.")
+
+    try:
+        from ROAST import ExpertInstanceExtractor
+
+        concepts = [concept.strip() for concept in args.concepts.split(',')] if args.concepts else DEFAULT_CONCEPTS
+        extractor = ExpertInstanceExtractor(
+            model_name_or_path=args.qa_model,
+            reader_batch_size=args.reader_batch_size,
+            answer_cache_path=args.answer_cache_path,
+            answer_cache_max_entries=args.answer_cache_max_entries
+        )
+        text_content = Path(args.input_file).read_text(encoding='utf-8')
+
+        if args.warm_cache_only:
+            warm_answer_cache(extractor, text_content, concepts, pairs_per_reader_run=args.pairs_per_reader_run)
+            print(f"Answer cache stats: {extractor.cache_stats()['answers']}")
+        else:
+            processor = DocumentProcessor(
+                checkpoint_path=args.checkpoint_path,
+                confidence_threshold=args.threshold,
+                batch_size=args.batch_size,
+                backend=args.backend
+            )
+            pipeline = DocumentPipeline(
+                processor,
+                extractor,
+                concepts=concepts,
+                skip_rules=load_skip_rules(args.skip_rules),
+                pairs_per_reader_run=args.pairs_per_reader_run
+            )
+
+            results = pipeline.process_text_content(text_content, title=args.title or Path(args.input_file).stem)
+            DocumentProcessor.save_to_json(data=results, output_file_path=args.output_file)
+
+        print("\n--- Process finished successfully ---")
+
+    except Exception as e:
+        print(f"\nERROR: A critical error occurred: {e}")
@@ -0,0 +1,231 @@
+import argparse
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+
+from process_document import DocumentProcessor
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent classification requests into micro-batches for a single DocumentProcessor.
+    A batch is run as soon as it holds max_batch_size texts, or max_wait_ms after its first text arrived.
+    """
+
+    def __init__(self, processor: DocumentProcessor, max_batch_size: int = 32, max_wait_ms: float = 10.0):
+        self.processor = processor
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.queue = None
+        self._worker = None
+        # Forward passes are serialized on one thread so the event loop keeps accepting requests
+        self._executor = ThreadPoolExecutor(max_workers=1)
+
+    async def start(self):
+        self.queue = asyncio.Queue()
+        self._worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._worker:
+            self._worker.cancel()
+        self._executor.shutdown(wait=False)
+
+    async def submit(self, text: str):
+        """Queues one text and waits for its (sense_probs, age_probs)."""
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((text, future))
+        return await future
+
+    async def submit_many(self, texts: list[str]):
+        """Queues several texts at once; they are batched together with any other pending requests."""
+        return await asyncio.gather(*(self.submit(text) for text in texts))
+
+    async def _collect_batch(self):
+        loop = asyncio.get_running_loop()
+        batch = [await self.queue.get()]
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect_batch()
+            texts = [text for text, _ in batch]
+            try:
+                sense_probs, age_probs = await loop.run_in_executor(
+                    self._executor, self.processor._predict_batch_with_probabilities, texts, False
+                )
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for i, (_, future) in enumerate(batch):
+                if not future.done():
+                    future.set_result((sense_probs[i], age_probs[i]))
+
+
+class InferenceServer:
+    """
+    A minimal long-running HTTP/JSON service around DocumentProcessor.
+    The model and tokenizer are loaded once at startup; all requests share one MicroBatcher.
+
+    Endpoints:
+        POST /classify           {"text": "..."}                  -> one paragraph result
+        POST /classify_document  {"text": "...", "title": "..."}  -> {"title": ..., "paragraphs": [...]}
+        GET  /health
+    """
+
+    def __init__(self, processor: DocumentProcessor, max_batch_size: int = 32, max_wait_ms: float = 10.0):
+        self.processor = processor
+        self.batcher = MicroBatcher(processor, max_batch_size=max_batch_size, max_wait_ms=max_wait_ms)
+        self.routes = {
+            ("POST", "/classify"): self.classify,
+            ("POST", "/classify_document"): self.classify_document,
+            ("GET", "/health"): self.health,
+        }
+
+    async def classify(self, payload: dict) -> dict:
+        text = payload.get("text")
+        if not isinstance(text, str) or not text:
+            raise ValueError("'text' must be a non-empty string.")
+        sense_probs, age_probs = await self.batcher.submit(text)
+        return self.processor._decode_predictions([text], [sense_probs], [age_probs])[0]
+
+    async def classify_document(self, payload: dict) -> dict:
+        text = payload.get("text")
+        if not isinstance(text, str):
+            raise ValueError("'text' must be a string.")
+        title = payload.get("title") or "Untitled"
+        paragraphs = self.processor.split_paragraphs(text)
+        if not paragraphs:
+            return {'title': title, 'paragraphs': []}
+        predictions = await self.batcher.submit_many(paragraphs)
+        sense_probs = [sense for sense, _ in predictions]
+        age_probs = [age for _, age in predictions]
+        return {'title': title, 'paragraphs': self.processor._decode_predictions(paragraphs, sense_probs, age_probs)}
+
+    async def health(self, payload: dict) -> dict:
+        response = {"status": "ok", "device": str(self.processor.device)}
+        if self.processor.cache is not None:
+            response["cache"] = self.processor.cache.stats()
+        return response
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            request_line = (await reader.readline()).decode("latin-1").strip()
+            if not request_line:
+                return
+            method, path, _ = request_line.split(" ", 2)
+            headers = {}
+            while True:
+                line = (await reader.readline()).decode("latin-1").strip()
+                if not line:
+                    break
+                name, _, value = line.partition(":")
+                headers[name.strip().lower()] = value.strip()
+
+            body = await reader.readexactly(int(headers.get("content-length", 0)))
+            handler = self.routes.get((method.upper(), path.split("?", 1)[0]))
+            if handler is None:
+                status, response = HTTPStatus.NOT_FOUND, {"error": f"No route for {method} {path}"}
+            else:
+                try:
+                    payload = json.loads(body) if body else {}
+                    status, response = HTTPStatus.OK, await handler(payload)
+                except (ValueError, AttributeError) as e:
+                    status, response = HTTPStatus.BAD_REQUEST, {"error": str(e)}
+                except Exception as e:
+                    status, response = HTTPStatus.INTERNAL_SERVER_ERROR, {"error": str(e)}
+            await self._write_response(writer, status, response)
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _write_response(writer: asyncio.StreamWriter, status: HTTPStatus, response: dict):
+        body = json.dumps(response, ensure_ascii=False).encode("utf-8")
+        head = (
+            f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+            "Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            "Connection: close\r\n\r\n"
+        )
+        writer.write(head.encode("latin-1") + body)
+        await writer.drain()
+
+    async def serve(self, host: str, port: int):
+        await self.batcher.start()
+        server = await asyncio.start_server(self._handle_connection, host, port)
+        print(f"--- Inference server listening on http://{host}:{port} ---")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            await self.batcher.stop()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Serve the RoBERTa sense/age classifier over HTTP with micro-batching.")
+    parser.add_argument("--checkpoint_path", type=str, default="checkpoints/best-checkpoint-epoch=02-val_loss=0.90.ckpt", help="Path to the trained model .ckpt file.")
+    parser.add_argument("--host", type=str, default="127.0.0.1", help="Interface to bind.")
+    parser.add_argument("--port", type=int, default=8008, help="Port to listen on.")
+    parser.add_argument("--threshold", type=float, default=0.9,
+                        help="Confidence threshold to fallback to previous paragraph's prediction.")
+    parser.add_argument("--allowed_senses", type=str, default=None,
+                        help="Comma-separated list of allowed sense class IDs (e.g., '2,3').")
+    parser.add_argument("--allowed_ages", type=str, default=None,
+                        help="Comma-separated list of allowed age class IDs (e.g., '0,1').")
+    parser.add_argument("--max_batch_size", type=int, default=32, help="Maximum number of texts per micro-batch.")
+    parser.add_argument("--max_wait_ms", type=float, default=10.0,
+                        help="How long a micro-batch waits for more requests before running.")
+    parser.add_argument("--backend", type=str, choices=["torch", "onnx"], default="torch",
+                        help="Inference backend; with 'onnx', --checkpoint_path is an onnx_backend.py export directory.")
+    parser.add_argument("--sliding_window", action="store_true",
+                        help="Classify paragraphs longer than the token budget as overlapping windows instead of truncating them.")
+    parser.add_argument("--window_overlap", type=int, default=32, help="Tokens shared by neighbouring windows.")
+    parser.add_argument("--window_aggregation", type=str, choices=["mean", "max"], default="mean",
+                        help="Combine window probabilities by their mean or keep the most confident window.")
+    parser.add_argument("--token_chunking", action="store_true",
+                        help="Size paragraphs to the model's token budget instead of ~128 words.")
+    parser.add_argument("--quantize", action="store_true",
+                        help="Use the dynamic INT8 quantized model on CPU (created next to the checkpoint on first use).")
+    parser.add_argument("--cache_path", type=str, default=None,
+                        help="Path to an on-disk cache of paragraph probabilities (SQLite file); disabled if omitted.")
+    parser.add_argument("--cache_max_entries", type=int, default=100_000,
+                        help="Maximum number of cached paragraphs before least recently used ones are evicted.")
+    args = parser.parse_args()
+
+    allowed_senses_ids = [int(id_str) for id_str in args.allowed_senses.split(',')] if args.allowed_senses else None
+    allowed_ages_ids = [int(id_str) for id_str in args.allowed_ages.split(',')] if args.allowed_ages else None
+
+    processor = DocumentProcessor(
+        checkpoint_path=args.checkpoint_path,
+        confidence_threshold=args.threshold,
+        allowed_senses=allowed_senses_ids,
+        allowed_ages=allowed_ages_ids,
+        batch_size=args.max_batch_size,
+        cache_path=args.cache_path,
+        cache_max_entries=args.cache_max_entries,
+        quantize=args.quantize,
+        backend=args.backend,
+        sliding_window=args.sliding_window,
+        window_overlap=args.window_overlap,
+        window_aggregation=args.window_aggregation,
+        token_chunking=args.token_chunking
+    )
+    server = InferenceServer(processor, max_batch_size=args.max_batch_size, max_wait_ms=args.max_wait_ms)
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        print("\n--- Inference server stopped ---")
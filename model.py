@@ -1,30 +1,9 @@
 import torch
 from torch import nn
 import pytorch_lightning as pl
-from transformers import RobertaModel, get_linear_schedule_with_warmup, RobertaTokenizer
-import torchmetrics
-from torch.optim import AdamW
-
-from data_processor import DataProcessor
-
-class ClassificationHead(nn.Module):
-    """A more advanced classification head with multiple layers and dropout."""
-
-    def __init__(self, hidden_size: int, num_labels: int, dropout_rate: float = 0.2):
-        super().__init__()
-        self.dense = nn.Linear(hidden_size, hidden_size)
-        self.dropout = nn.Dropout(dropout_rate)
-        self.out_proj = nn.Linear(hidden_size, num_labels)
-        self.activation = nn.ReLU()
-
-    def forward(self, features):
-        x = self.dropout(features)
-        x = self.dense(x)
-        x = self.activation(x)
-        x = self.dropout(x)
-        x = self.out_proj(x)
-        return x
+from transformers import RobertaModel, RobertaTokenizerFast
 
+from network import ClassificationHead, predict_single_text
 
 class RoBERTaMultiTaskClassifier(pl.LightningModule):
     """The main model class with advanced heads, comprehensive metrics, and a predict method."""
@@ -35,14 +14,26 @@ class RoBERTaMultiTaskClassifier(pl.LightningModule):
         self.save_hyperparameters()
 
         self.roberta = RobertaModel.from_pretrained(model_name, return_dict=True, local_files_only=True)
-        # Tokenizer needs to be part of the model for easy prediction
-        self.tokenizer = RobertaTokenizer.from_pretrained(model_name, local_files_only=True)
+        # Tokenizer needs to be part of the model for easy prediction. It is rebuilt from model_name on load, never
+        # stored in the checkpoint; the fast (Rust) tokenizer produces the same ids as RobertaTokenizer
+        # (see `benchmark.py tokenizer_parity`).
+        self.tokenizer = RobertaTokenizerFast.from_pretrained(model_name, local_files_only=True)
 
         self.sense_classifier = ClassificationHead(self.roberta.config.hidden_size, n_sense_classes)
         self.age_classifier = ClassificationHead(self.roberta.config.hidden_size, n_age_classes)
 
         self.criterion = nn.CrossEntropyLoss()
 
+    def setup(self, stage: str):
+        """
+        Builds the metric collections when a Trainer starts, so loading the model for inference never imports
+        torchmetrics. Metric states are not persistent, so checkpoints are unaffected.
+        """
+        if hasattr(self, "train_sense_metrics"):
+            return
+        import torchmetrics
+
+        n_sense_classes, n_age_classes = self.hparams.n_sense_classes, self.hparams.n_age_classes
         metric_collection = lambda num_classes, prefix: torchmetrics.MetricCollection({
             'acc': torchmetrics.Accuracy(task="multiclass", num_classes=num_classes),
             'f1': torchmetrics.F1Score(task="multiclass", num_classes=num_classes, average='macro'),
@@ -74,11 +65,17 @@ class RoBERTaMultiTaskClassifier(pl.LightningModule):
 
     def training_step(self, batch, batch_idx):
         total_loss, sense_logits, age_logits = self._shared_step(batch)
-        self.log("train_loss", total_loss, on_step=True, on_epoch=True, prog_bar=True, logger=True)
+        # Same keys as one on_step + on_epoch log, but only the epoch mean is synced across processes: a per-step
+        # sync_dist would add an all-reduce to every training batch
+        self.log("train_loss_step", total_loss, on_step=True, on_epoch=False, prog_bar=True, logger=True)
+        self.log("train_loss_epoch", total_loss, on_step=False, on_epoch=True, logger=True, sync_dist=True)
         self.train_sense_metrics.update(sense_logits, batch["sense_labels"])
         self.train_age_metrics.update(age_logits, batch["age_labels"])
         return total_loss
 
+    # Under DDP, the epoch losses are averaged across processes (sync_dist), so that checkpointing and early
+    # stopping see the same val_loss on every rank. The torchmetrics collections need no such flag: compute() already
+    # reduces their states over all processes.
     def on_train_epoch_end(self):
         self.log_dict(self.train_sense_metrics.compute())
         self.log_dict(self.train_age_metrics.compute())
@@ -87,7 +84,7 @@ class RoBERTaMultiTaskClassifier(pl.LightningModule):
 
     def validation_step(self, batch, batch_idx):
         total_loss, sense_logits, age_logits = self._shared_step(batch)
-        self.log("val_loss", total_loss, prog_bar=True, logger=True)
+        self.log("val_loss", total_loss, prog_bar=True, logger=True, sync_dist=True)
         self.val_sense_metrics.update(sense_logits, batch["sense_labels"])
         self.val_age_metrics.update(age_logits, batch["age_labels"])
 
@@ -99,7 +96,7 @@ class RoBERTaMultiTaskClassifier(pl.LightningModule):
 
     def test_step(self, batch, batch_idx):
         total_loss, sense_logits, age_logits = self._shared_step(batch)
-        self.log("test_loss", total_loss, logger=True)
+        self.log("test_loss", total_loss, logger=True, sync_dist=True)
         self.test_sense_metrics.update(sense_logits, batch["sense_labels"])
         self.test_age_metrics.update(age_logits, batch["age_labels"])
 
@@ -110,6 +107,9 @@ class RoBERTaMultiTaskClassifier(pl.LightningModule):
         self.test_age_metrics.reset()
 
     def configure_optimizers(self):
+        from torch.optim import AdamW
+        from transformers import get_linear_schedule_with_warmup
+
         optimizer = AdamW(self.parameters(), lr=self.hparams.learning_rate)
         scheduler = get_linear_schedule_with_warmup(
             optimizer,
@@ -124,50 +124,5 @@ class RoBERTaMultiTaskClassifier(pl.LightningModule):
         """
         # Set model to evaluation mode
         self.eval()
-
-        # 1. Preprocess the text using the same cleaner as in training
-        cleaned_text = DataProcessor._clean_text(text)
-
-        # 2. Tokenize the cleaned text
-        encoding = self.tokenizer.encode_plus(
-            cleaned_text,
-            add_special_tokens=True,
-            max_length=self.hparams.max_token_len,
-            return_token_type_ids=False,
-            padding="max_length",
-            truncation=True,
-            return_attention_mask=True,
-            return_tensors='pt',
-        )
-
-        input_ids = encoding["input_ids"].to(self.device)
-        attention_mask = encoding["attention_mask"].to(self.device)
-
-        # 3. Perform inference
-        with torch.no_grad():
-            sense_logits, age_logits = self(input_ids, attention_mask)
-
-        # 4. Get probabilities and predictions
-        sense_probs = torch.softmax(sense_logits, dim=1)
-        age_probs = torch.softmax(age_logits, dim=1)
-
-        sense_pred_id = torch.argmax(sense_probs, dim=1).item()
-        age_pred_id = torch.argmax(age_probs, dim=1).item()
-
-        sense_pred_name = sense_id_map[sense_pred_id]
-        age_pred_name = age_id_map[age_pred_id]
-
-        return {
-            "text": text,
-            "cleaned_text": cleaned_text,
-            "sense_prediction": {
-                "class_name": sense_pred_name,
-                "class_id": sense_pred_id,
-                "confidence": sense_probs.max().item()
-            },
-            "age_prediction": {
-                "class_name": age_pred_name,
-                "class_id": age_pred_id,
-                "confidence": age_probs.max().item()
-            }
-        }
+        return predict_single_text(self, self.tokenizer, self.hparams.max_token_len, text, sense_id_map, age_id_map,
+                                   self.device)
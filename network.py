@@ -0,0 +1,188 @@
+import argparse
+import json
+from pathlib import Path
+
+import torch
+from torch import nn
+from transformers import AutoTokenizer, RobertaConfig, RobertaModel
+
+from text_cleaning import clean_text
+
+WEIGHTS_FILENAME = "model.safetensors"
+METADATA_FILENAME = "classifier.json"
+
+
+class ClassificationHead(nn.Module):
+    """A more advanced classification head with multiple layers and dropout."""
+
+    def __init__(self, hidden_size: int, num_labels: int, dropout_rate: float = 0.2):
+        super().__init__()
+        self.dense = nn.Linear(hidden_size, hidden_size)
+        self.dropout = nn.Dropout(dropout_rate)
+        self.out_proj = nn.Linear(hidden_size, num_labels)
+        self.activation = nn.ReLU()
+
+    def forward(self, features):
+        x = self.dropout(features)
+        x = self.dense(x)
+        x = self.activation(x)
+        x = self.dropout(x)
+        x = self.out_proj(x)
+        return x
+
+
+def predict_single_text(forward, tokenizer, max_token_len: int, text: str, sense_id_map: dict, age_id_map: dict,
+                        device="cpu") -> dict:
+    """
+    The single-text inference path shared by the predict methods of RoBERTaMultiTaskClassifier,
+    MultiTaskNetwork and OnnxClassifier. `forward(input_ids, attention_mask)` returns (sense_logits, age_logits).
+    """
+    # 1. Preprocess the text using the same cleaner as in training
+    cleaned_text = clean_text(text)
+
+    # 2. Tokenize the cleaned text
+    encoding = tokenizer(
+        cleaned_text,
+        add_special_tokens=True,
+        max_length=max_token_len,
+        return_token_type_ids=False,
+        padding="max_length",
+        truncation=True,
+        return_attention_mask=True,
+        return_tensors='pt',
+    )
+
+    # 3. Perform inference
+    with torch.no_grad():
+        sense_logits, age_logits = forward(encoding["input_ids"].to(device), encoding["attention_mask"].to(device))
+
+    # 4. Get probabilities and predictions
+    sense_probs = torch.softmax(sense_logits, dim=1)
+    age_probs = torch.softmax(age_logits, dim=1)
+    sense_pred_id = torch.argmax(sense_probs, dim=1).item()
+    age_pred_id = torch.argmax(age_probs, dim=1).item()
+
+    return {
+        "text": text,
+        "cleaned_text": cleaned_text,
+        "sense_prediction": {
+            "class_name": sense_id_map[sense_pred_id],
+            "class_id": sense_pred_id,
+            "confidence": sense_probs.max().item()
+        },
+        "age_prediction": {
+            "class_name": age_id_map[age_pred_id],
+            "class_id": age_pred_id,
+            "confidence": age_probs.max().item()
+        }
+    }
+
+
+class MultiTaskNetwork(nn.Module):
+    """
+    The inference network of RoBERTaMultiTaskClassifier (encoder plus both heads, same parameter names) as a
+    plain nn.Module: no Lightning, no metrics, no optimizer. Built from an artifact by load_inference_model.
+    """
+
+    def __init__(self, config: RobertaConfig, n_sense_classes: int, n_age_classes: int, max_token_len: int = 128):
+        super().__init__()
+        self.roberta = RobertaModel(config)
+        self.sense_classifier = ClassificationHead(config.hidden_size, n_sense_classes)
+        self.age_classifier = ClassificationHead(config.hidden_size, n_age_classes)
+        self.max_token_len = max_token_len
+        self.tokenizer = None
+
+    def forward(self, input_ids, attention_mask):
+        output = self.roberta(input_ids=input_ids, attention_mask=attention_mask)
+        pooled_output = output.pooler_output
+        sense_logits = self.sense_classifier(pooled_output)
+        age_logits = self.age_classifier(pooled_output)
+        return sense_logits, age_logits
+
+    def predict(self, text: str, sense_id_map: dict, age_id_map: dict):
+        """Same output as RoBERTaMultiTaskClassifier.predict."""
+        self.eval()
+        device = next(self.parameters()).device
+        return predict_single_text(self, self.tokenizer, self.max_token_len, text, sense_id_map, age_id_map, device)
+
+
+def is_inference_artifact(path: str) -> bool:
+    return Path(path).is_dir() and (Path(path) / WEIGHTS_FILENAME).exists()
+
+
+def export_inference_artifact(checkpoint_path: str, output_dir: str) -> Path:
+    """
+    Writes the slim inference artifact of a Lightning checkpoint to `output_dir`: safetensors weights of the
+    encoder and both heads, the encoder config, the tokenizer files and classifier.json (token budget, class maps).
+    Optimizer state, metrics and hyperparameters used only for training are left behind.
+    """
+    from safetensors.torch import save_file
+    from model import RoBERTaMultiTaskClassifier
+    from process_document import SENSE_CLASSES, AGE_CLASSES
+
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    model = RoBERTaMultiTaskClassifier.load_from_checkpoint(checkpoint_path=checkpoint_path, map_location="cpu")
+
+    prefixes = ("roberta.", "sense_classifier.", "age_classifier.")
+    state_dict = {name: tensor.contiguous() for name, tensor in model.state_dict().items() if name.startswith(prefixes)}
+    save_file(state_dict, str(output_dir / WEIGHTS_FILENAME))
+    model.roberta.config.save_pretrained(output_dir)
+    model.tokenizer.save_pretrained(output_dir)
+    with open(output_dir / METADATA_FILENAME, "w", encoding="utf-8") as f:
+        json.dump({
+            "max_token_len": model.hparams.max_token_len,
+            "n_sense_classes": model.hparams.n_sense_classes,
+            "n_age_classes": model.hparams.n_age_classes,
+            "sense_classes": SENSE_CLASSES,
+            "age_classes": AGE_CLASSES,
+            "source_checkpoint": str(checkpoint_path),
+        }, f, indent=4)
+    print(f"Exported inference artifact to: {output_dir}")
+    return output_dir
+
+
+def load_inference_model(artifact_dir: str, device="cpu") -> MultiTaskNetwork:
+    """
+    Builds MultiTaskNetwork directly from an artifact written by export_inference_artifact.
+    The modules are created on the meta device, so no weights are allocated or initialized before the
+    safetensors weights are assigned in place; pretrained base weights are never read.
+    """
+    from safetensors.torch import load_file
+
+    artifact_dir = Path(artifact_dir)
+    with open(artifact_dir / METADATA_FILENAME, encoding="utf-8") as f:
+        metadata = json.load(f)
+    config = RobertaConfig.from_pretrained(str(artifact_dir))
+    device = torch.device(device)
+
+    with torch.device("meta"):
+        network = MultiTaskNetwork(config, metadata["n_sense_classes"], metadata["n_age_classes"],
+                                   max_token_len=metadata["max_token_len"])
+    state_dict = load_file(str(artifact_dir / WEIGHTS_FILENAME), device=str(device))
+    network.load_state_dict(state_dict, strict=True, assign=True)
+
+    # Non-persistent buffers are not part of the weights: rebuild them as RobertaEmbeddings does
+    embeddings = network.roberta.embeddings
+    position_ids = torch.arange(config.max_position_embeddings, device=device).expand((1, -1))
+    embeddings.register_buffer("position_ids", position_ids, persistent=False)
+    embeddings.register_buffer("token_type_ids", torch.zeros(position_ids.size(), dtype=torch.long, device=device),
+                               persistent=False)
+    leftover = [name for name, tensor in [*network.named_parameters(), *network.named_buffers()] if tensor.is_meta]
+    if leftover:
+        raise RuntimeError(f"Tensors missing from the inference artifact: {leftover}")
+
+    network.tokenizer = AutoTokenizer.from_pretrained(str(artifact_dir))
+    network.eval()
+    network.requires_grad_(False)
+    return network
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Export a Lightning checkpoint to a slim inference artifact.")
+    parser.add_argument("--checkpoint_path", type=str, required=True, help="Path to the trained model .ckpt file.")
+    parser.add_argument("--output_dir", type=str, required=True,
+                        help="Directory for model.safetensors, config, tokenizer files and classifier.json.")
+    args = parser.parse_args()
+
+    export_inference_artifact(args.checkpoint_path, args.output_dir)
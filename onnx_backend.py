@@ -0,0 +1,163 @@
+import argparse
+import json
+from pathlib import Path
+
+import numpy as np
+import torch
+from torch import nn
+from transformers import AutoTokenizer
+
+from network import predict_single_text
+from text_cleaning import clean_text
+
+ONNX_FILENAME = "model.onnx"
+METADATA_FILENAME = "classifier.json"
+
+
+class _ExportWrapper(nn.Module):
+    """Exposes only the inference graph of RoBERTaMultiTaskClassifier: encoder plus both heads."""
+
+    def __init__(self, model: nn.Module):
+        super().__init__()
+        self.model = model
+
+    def forward(self, input_ids, attention_mask):
+        sense_logits, age_logits = self.model(input_ids, attention_mask)
+        return sense_logits, age_logits
+
+
+def export_onnx(checkpoint_path: str, output_dir: str, opset_version: int = 17) -> Path:
+    """
+    Exports a Lightning checkpoint to `output_dir`: model.onnx with dynamic batch and sequence axes,
+    the tokenizer files and classifier.json holding max_token_len.
+    """
+    from model import RoBERTaMultiTaskClassifier
+
+    model = RoBERTaMultiTaskClassifier.load_from_checkpoint(checkpoint_path=checkpoint_path, map_location="cpu")
+    model.freeze()
+    model.eval()
+    return export_model_onnx(model, model.hparams.max_token_len, output_dir, opset_version=opset_version,
+                             source_checkpoint=str(checkpoint_path))
+
+
+def export_model_onnx(model: nn.Module, max_token_len: int, output_dir: str, opset_version: int = 17,
+                      source_checkpoint: str = None) -> Path:
+    """
+    Export step of export_onnx for an already loaded model in eval mode: any module with the calling convention
+    of RoBERTaMultiTaskClassifier and a `tokenizer` attribute, such as network.MultiTaskNetwork.
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    sample = model.tokenizer(["an example paragraph for tracing"], return_tensors="pt")
+    onnx_path = output_dir / ONNX_FILENAME
+    torch.onnx.export(
+        _ExportWrapper(model),
+        (sample["input_ids"], sample["attention_mask"]),
+        str(onnx_path),
+        input_names=["input_ids", "attention_mask"],
+        output_names=["sense_logits", "age_logits"],
+        dynamic_axes={
+            "input_ids": {0: "batch", 1: "sequence"},
+            "attention_mask": {0: "batch", 1: "sequence"},
+            "sense_logits": {0: "batch"},
+            "age_logits": {0: "batch"},
+        },
+        opset_version=opset_version,
+    )
+    model.tokenizer.save_pretrained(output_dir)
+    with open(output_dir / METADATA_FILENAME, "w", encoding="utf-8") as f:
+        json.dump({"max_token_len": max_token_len, "source_checkpoint": source_checkpoint}, f, indent=4)
+    print(f"Exported ONNX model to: {onnx_path}")
+    return onnx_path
+
+
+def check_parity(checkpoint_path: str, onnx_dir: str, texts: list[str], tolerance: float = 1e-3) -> dict:
+    """
+    Runs the PyTorch model and the ONNX model on the same batch and returns the max absolute logit differences;
+    within_tolerance is False if either exceeds `tolerance`.
+    """
+    from model import RoBERTaMultiTaskClassifier
+
+    torch_model = RoBERTaMultiTaskClassifier.load_from_checkpoint(checkpoint_path=checkpoint_path, map_location="cpu")
+    torch_model.freeze()
+    torch_model.eval()
+    return compare_logits(torch_model, OnnxClassifier(onnx_dir), texts, tolerance=tolerance)
+
+
+def compare_logits(torch_model: nn.Module, onnx_model: "OnnxClassifier", texts: list[str],
+                   tolerance: float = 1e-3) -> dict:
+    """The comparison of check_parity, for an already loaded PyTorch model in eval mode."""
+    encoding = onnx_model.tokenizer([clean_text(text) for text in texts], max_length=onnx_model.max_token_len,
+                                    padding="longest", truncation=True, return_tensors="pt")
+    with torch.no_grad():
+        torch_sense, torch_age = torch_model(encoding["input_ids"], encoding["attention_mask"])
+    onnx_sense, onnx_age = onnx_model(encoding["input_ids"], encoding["attention_mask"])
+    max_sense_diff = (torch_sense - onnx_sense).abs().max().item()
+    max_age_diff = (torch_age - onnx_age).abs().max().item()
+    return {
+        "max_abs_diff_sense_logits": max_sense_diff,
+        "max_abs_diff_age_logits": max_age_diff,
+        "same_sense_argmax": bool((torch_sense.argmax(dim=1) == onnx_sense.argmax(dim=1)).all()),
+        "same_age_argmax": bool((torch_age.argmax(dim=1) == onnx_age.argmax(dim=1)).all()),
+        "within_tolerance": max(max_sense_diff, max_age_diff) <= tolerance,
+    }
+
+
+class OnnxClassifier:
+    """
+    ONNX Runtime backend with the calling convention of RoBERTaMultiTaskClassifier:
+    `model(input_ids, attention_mask)` returns (sense_logits, age_logits) as torch tensors.
+    Needs only onnxruntime, transformers' tokenizer and torch; pytorch_lightning is never imported.
+    """
+
+    def __init__(self, onnx_dir: str, providers: list[str] = None, intra_op_num_threads: int = None):
+        import onnxruntime as ort
+
+        onnx_dir = Path(onnx_dir)
+        with open(onnx_dir / METADATA_FILENAME, encoding="utf-8") as f:
+            self.metadata = json.load(f)
+        self.max_token_len = self.metadata["max_token_len"]
+        self.tokenizer = AutoTokenizer.from_pretrained(str(onnx_dir))
+
+        options = ort.SessionOptions()
+        if intra_op_num_threads:
+            options.intra_op_num_threads = intra_op_num_threads
+        self.session = ort.InferenceSession(str(onnx_dir / ONNX_FILENAME), sess_options=options,
+                                            providers=providers or ["CPUExecutionProvider"])
+
+    def __call__(self, input_ids: torch.Tensor, attention_mask: torch.Tensor):
+        sense_logits, age_logits = self.session.run(
+            ["sense_logits", "age_logits"],
+            {
+                "input_ids": input_ids.cpu().numpy().astype(np.int64),
+                "attention_mask": attention_mask.cpu().numpy().astype(np.int64),
+            },
+        )
+        return torch.from_numpy(sense_logits), torch.from_numpy(age_logits)
+
+    def predict(self, text: str, sense_id_map: dict, age_id_map: dict):
+        """Same output as RoBERTaMultiTaskClassifier.predict."""
+        return predict_single_text(self, self.tokenizer, self.max_token_len, text, sense_id_map, age_id_map)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Export the multi-task classifier to ONNX and check logit parity.")
+    parser.add_argument("--checkpoint_path", type=str, required=True, help="Path to the trained model .ckpt file.")
+    parser.add_argument("--output_dir", type=str, required=True, help="Directory for model.onnx and tokenizer files.")
+    parser.add_argument("--opset", type=int, default=17, help="ONNX opset version.")
+    parser.add_argument("--skip_parity_check", action="store_true", help="Do not compare ONNX and PyTorch logits.")
+    parser.add_argument("--tolerance", type=float, default=1e-3,
+                        help="Max absolute logit difference allowed; a larger one fails the export.")
+    args = parser.parse_args()
+
+    export_onnx(args.checkpoint_path, args.output_dir, opset_version=args.opset)
+    if not args.skip_parity_check:
+        parity = check_parity(args.checkpoint_path, args.output_dir, [
+            "The legions marched through the burning city as the drums of war echoed.",
+            "She read his letter again under the moonlight.",
+            "The starship drifted silently past the rings of the gas giant, its engines humming.",
+        ], tolerance=args.tolerance)
+        print(json.dumps(parity, indent=4))
+        if not parity["within_tolerance"]:
+            raise SystemExit(f"ERROR: ONNX logits differ from PyTorch by more than {args.tolerance}; "
+                             f"the export in {args.output_dir} is not usable.")
@@ -1,6 +1,6 @@
 import argparse
-from model import RoBERTaMultiTaskClassifier
 import json
+from pathlib import Path
 
 # Define the class mappings to decode predictions
 # You should get these from your initial data processing script
@@ -20,16 +20,30 @@ SENSE_ID_TO_NAME = {v: k for k, v in SENSE_CLASSES.items()}
 AGE_ID_TO_NAME = {v: k for k, v in AGE_CLASSES.items()}
 
 
-def predict_text(checkpoint_path: str, text: str):
+def predict_text(checkpoint_path: str, text: str, quantize: bool = False, backend: str = "torch"):
     """
     Loads a model from a checkpoint and predicts on a given text.
+    With quantize, the dynamic INT8 CPU model is used instead (see quantization.load_quantized_model).
+    With backend="onnx", checkpoint_path is an onnx_backend.py export directory and Lightning is not imported.
+    checkpoint_path may also be an inference artifact directory (see network.export_inference_artifact).
     """
     print(f"Loading model from checkpoint: {checkpoint_path}")
-    # Load the model from the checkpoint
-    trained_model = RoBERTaMultiTaskClassifier.load_from_checkpoint(
-        checkpoint_path=checkpoint_path
-    )
-    trained_model.freeze()  # Freeze weights for faster inference
+    if backend == "onnx":
+        from onnx_backend import OnnxClassifier
+        trained_model = OnnxClassifier(checkpoint_path)
+    elif quantize:
+        from quantization import load_quantized_model
+        trained_model = load_quantized_model(checkpoint_path)
+    elif Path(checkpoint_path).is_dir():
+        from network import load_inference_model
+        trained_model = load_inference_model(checkpoint_path)
+    else:
+        from model import RoBERTaMultiTaskClassifier
+        # Load the model from the checkpoint
+        trained_model = RoBERTaMultiTaskClassifier.load_from_checkpoint(
+            checkpoint_path=checkpoint_path
+        )
+        trained_model.freeze()  # Freeze weights for faster inference
 
     print(f"Predicting on text: '{text}'")
     prediction = trained_model.predict(
@@ -58,6 +72,18 @@ if __name__ == '__main__':
         required=True,
         help="The text string to classify."
     )
+    parser.add_argument(
+        "--quantize",
+        action="store_true",
+        help="Use the dynamic INT8 quantized model on CPU."
+    )
+    parser.add_argument(
+        "--backend",
+        type=str,
+        choices=["torch", "onnx"],
+        default="torch",
+        help="Inference backend; with 'onnx', --checkpoint_path is an onnx_backend.py export directory."
+    )
     args = parser.parse_args()
 
-    predict_text(args.checkpoint_path, args.text)
+    predict_text(args.checkpoint_path, args.text, quantize=args.quantize, backend=args.backend)
@@ -1,12 +1,19 @@
 import argparse
+import copy
+import itertools
 import json
+import os
+import queue
 import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 import torch
-from tqdm import tqdm
 
-from model import RoBERTaMultiTaskClassifier
-from data_processor import DataProcessor
+from text_cleaning import clean_text, clean_texts
+from quantization import load_quantized_model
+from result_cache import PredictionCache, checkpoint_identity
 
 
 SENSE_CLASSES = {
@@ -20,6 +27,9 @@ AGE_CLASSES = {
     "neutral and not special age (non-ancient, non technology)": 1,
     "technology modern age": 2,
 }
+SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?])\s+')
+# Put by the pipeline's producer thread after the last batch
+_END_OF_STREAM = object()
 
 
 class DocumentProcessor:
@@ -28,13 +38,51 @@ class DocumentProcessor:
     """
 
     def __init__(self, checkpoint_path: str, confidence_threshold: float = 0.0, allowed_senses: list[int] = None,
-                 allowed_ages: list[int] = None):
+                 allowed_ages: list[int] = None, batch_size: int = 1, cache_path: str = None,
+                 cache_max_entries: int = 100_000, quantize: bool = False, backend: str = "torch",
+                 sliding_window: bool = False, window_overlap: int = 32, window_aggregation: str = "mean",
+                 token_chunking: bool = False, pipeline_workers: int = 0, queue_depth: int = 4):
         """
         Initializes the processor, loads the model, and sets processing parameters.
+        A batch_size greater than 1 enables batched, length-bucketed inference.
+        A cache_path enables the on-disk cache of paragraph probabilities (see result_cache.PredictionCache).
+        quantize selects the dynamic INT8 model (CPU only, see quantization.load_quantized_model).
+        backend="onnx" runs an ONNX Runtime export instead; checkpoint_path is then the export directory
+        written by onnx_backend.export_onnx, and pytorch_lightning is not imported.
+        With the torch backend, checkpoint_path may also be an inference artifact directory written by
+        network.export_inference_artifact, which loads faster and without Lightning.
+        sliding_window classifies paragraphs longer than max_token_len as overlapping token windows
+        (window_overlap tokens shared by neighbours) whose probabilities are combined by window_aggregation:
+        "mean", or "max" to keep the most confident window. token_chunking sizes paragraphs to the token
+        budget instead of ~128 words.
+        pipeline_workers > 0 overlaps preprocessing with inference (see _iter_pipelined_results): chunking runs on a
+        producer thread and cleaning plus tokenization on pipeline_workers threads, at most queue_depth batches ahead
+        of the model.
         """
+        if backend not in ("torch", "onnx"):
+            raise ValueError(f"Unknown backend '{backend}', expected 'torch' or 'onnx'.")
+        if backend == "onnx" and quantize:
+            raise ValueError("quantize applies to the torch backend only.")
+        if window_aggregation not in ("mean", "max"):
+            raise ValueError(f"Unknown window_aggregation '{window_aggregation}', expected 'mean' or 'max'.")
+        if pipeline_workers < 0 or queue_depth < 1:
+            raise ValueError("pipeline_workers must be >= 0 and queue_depth >= 1.")
         print(f"--- Initializing DocumentProcessor from: {checkpoint_path} ---")
-        self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+        self.quantize = quantize
+        self.backend = backend
+        self.device = torch.device("cuda" if torch.cuda.is_available() and backend == "torch" and not quantize else "cpu")
         self.model = self._load_model(checkpoint_path)
+        # Every model type exposes the tokenizer; the token budget lives in hparams for Lightning models
+        self.tokenizer = self.model.tokenizer
+        self.max_token_len = self.model.hparams.max_token_len if hasattr(self.model, "hparams") else self.model.max_token_len
+        # Tokens left for text once <s> and </s> are added
+        self.token_budget = self.max_token_len - self.tokenizer.num_special_tokens_to_add()
+        if sliding_window and not 0 <= window_overlap < self.token_budget:
+            raise ValueError(f"window_overlap must be in [0, {self.token_budget}), got {window_overlap}.")
+        self.sliding_window = sliding_window
+        self.window_overlap = window_overlap
+        self.window_aggregation = window_aggregation
+        self.token_chunking = token_chunking
 
         # Reverse maps for decoding predictions
         self.sense_id_to_name = {v: k for k, v in SENSE_CLASSES.items()}
@@ -42,6 +90,17 @@ class DocumentProcessor:
 
         # Store processing parameters
         self.confidence_threshold = confidence_threshold
+        self.batch_size = max(1, batch_size)
+        self.pipeline_workers = pipeline_workers
+        self.queue_depth = queue_depth
+        self.pipeline_stats = {}
+        self._thread_state = threading.local()
+        if self.pipeline_workers and not getattr(self.tokenizer, "is_fast", False):
+            # The pure-Python tokenizer holds the GIL throughout, so tokenizer threads could not overlap with
+            # inference; its fast counterpart produces the same ids (see `benchmark.py tokenizer_parity`)
+            from transformers import AutoTokenizer
+            self.tokenizer = AutoTokenizer.from_pretrained(self.tokenizer.name_or_path, use_fast=True)
+            print(f"Pipelined inference switched to the fast tokenizer of: {self.tokenizer.name_or_path}")
 
         # Convert allowed IDs to a set for efficient lookup
         self.allowed_sense_ids = set(allowed_senses) if allowed_senses else None
@@ -51,10 +110,47 @@ class DocumentProcessor:
         if self.allowed_sense_ids: print(f"Filtering for Sense IDs: {self.allowed_sense_ids}")
         if self.allowed_age_ids: print(f"Filtering for Age IDs: {self.allowed_age_ids}")
         print(f"Confidence threshold set to: {self.confidence_threshold}")
+        if self.batch_size > 1: print(f"Batched inference enabled with batch size: {self.batch_size}")
+        if self.sliding_window:
+            print(f"Sliding-window inference: overlap {self.window_overlap} tokens, {self.window_aggregation} aggregation")
+        if self.token_chunking: print(f"Token-aware chunking with a budget of {self.token_budget} tokens")
+        if self.pipeline_workers:
+            print(f"Pipelined inference: {self.pipeline_workers} tokenizer threads, queue depth {self.queue_depth}")
+
+        self.cache = None
+        if cache_path:
+            self.cache = PredictionCache(
+                cache_path,
+                model_identity=self._model_identity(checkpoint_path),
+                max_token_len=self.max_token_len,
+                max_entries=cache_max_entries
+            )
+            print(f"Prediction cache enabled at: {cache_path}")
+
+    def _model_identity(self, checkpoint_path: str) -> str:
+        if self.backend == "onnx":
+            from onnx_backend import ONNX_FILENAME
+            identity = checkpoint_identity(str(Path(checkpoint_path) / ONNX_FILENAME)) + ":onnx"
+        else:
+            identity = checkpoint_identity(checkpoint_path) + (":int8" if self.quantize else "")
+        # Windowed probabilities of long paragraphs differ from truncated ones
+        if self.sliding_window:
+            identity += f":window{self.window_overlap}-{self.window_aggregation}"
+        return identity
 
     def _load_model(self, checkpoint_path: str):
         """Internal method to load the model and move it to the correct device."""
         try:
+            if self.backend == "onnx":
+                from onnx_backend import OnnxClassifier
+                return OnnxClassifier(checkpoint_path)
+            if self.quantize:
+                return load_quantized_model(checkpoint_path)
+            from network import is_inference_artifact, load_inference_model
+            if is_inference_artifact(checkpoint_path):
+                return load_inference_model(checkpoint_path, device=self.device)
+            # Imported here so the ONNX backend never pulls in pytorch_lightning
+            from model import RoBERTaMultiTaskClassifier
             model = RoBERTaMultiTaskClassifier.load_from_checkpoint(
                 checkpoint_path=checkpoint_path,
                 map_location=self.device
@@ -74,14 +170,14 @@ class DocumentProcessor:
         A custom prediction method that returns full probability distributions.
         This is necessary because the original model.predict does not, and we cannot change it.
         """
-        # Step 1: Clean text using the original, unchanged DataProcessor
-        cleaned_text = DataProcessor._clean_text(text)
+        # Step 1: Clean text exactly like DataProcessor._clean_text, without importing pandas
+        cleaned_text = clean_text(text)
 
         # Step 2: Tokenize using the model's tokenizer
-        encoding = self.model.tokenizer.encode_plus(
+        encoding = self.tokenizer(
             cleaned_text,
             add_special_tokens=True,
-            max_length=self.model.hparams.max_token_len,
+            max_length=self.max_token_len,
             return_token_type_ids=False,
             padding="max_length",
             truncation=True,
@@ -101,83 +197,574 @@ class DocumentProcessor:
 
         return sense_probs, age_probs
 
-    def _get_best_allowed_prediction(self, probabilities: torch.Tensor, id_to_name_map: dict, allowed_ids: set = None):
-        """Finds the highest-confidence prediction within the list of allowed class IDs."""
-        # If no filter is applied, return the top prediction
-        if not allowed_ids:
-            top_prob, top_id_tensor = torch.max(probabilities, dim=0)
-            top_id = top_id_tensor.item()
-            return {
-                "class_name": id_to_name_map.get(top_id, "Unknown"),
-                "class_id": top_id,
-                "confidence": top_prob.item()
-            }
-
-        # Sort probabilities to find the best allowed one
-        sorted_probs, sorted_indices = torch.sort(probabilities, descending=True)
-
-        for i, idx_tensor in enumerate(sorted_indices):
-            idx = idx_tensor.item()
-            if idx in allowed_ids:
-                return {
-                    "class_name": id_to_name_map.get(idx, "Unknown"),
-                    "class_id": idx,
-                    "confidence": sorted_probs[i].item()
-                }
-
-        # Fallback if no allowed class is found
-        return {"class_name": "No allowed class found", "class_id": -1, "confidence": 0.0}
+    def _predict_batch_with_probabilities(self, texts: list[str], show_progress: bool = True):
+        """
+        Batched counterpart of _predict_with_probabilities.
+        Paragraphs found in the prediction cache are not recomputed; the rest go through
+        _forward_cleaned_batch and are added to the cache.
+        Returns (sense_probs, age_probs) stacked in the original order of `texts`.
+        """
+        cleaned_texts = clean_texts(texts)
+        cached, miss_indices = self._lookup_cache(cleaned_texts)
+        miss_sense_probs = miss_age_probs = None
+        if miss_indices:
+            miss_sense_probs, miss_age_probs = self._forward_cleaned_batch(
+                [cleaned_texts[idx] for idx in miss_indices], show_progress
+            )
+        return self._merge_predictions(cleaned_texts, cached, miss_indices, miss_sense_probs, miss_age_probs)
+
+    def _lookup_cache(self, cleaned_texts: list[str]):
+        """Returns the cached (sense, age) probabilities of each text (None on a miss) and the indices of the misses."""
+        if self.cache is None:
+            return [None] * len(cleaned_texts), list(range(len(cleaned_texts)))
+        cached = self.cache.get_predictions(cleaned_texts)
+        return cached, [idx for idx, entry in enumerate(cached) if entry is None]
+
+    def _merge_predictions(self, cleaned_texts: list[str], cached: list, miss_indices: list[int],
+                           miss_sense_probs, miss_age_probs):
+        """Adds freshly computed rows to the cache and stacks cached and fresh rows in the order of cleaned_texts."""
+        if miss_indices and self.cache is not None:
+            self.cache.put_predictions([cleaned_texts[idx] for idx in miss_indices],
+                                       miss_sense_probs.tolist(), miss_age_probs.tolist())
+        if len(miss_indices) == len(cleaned_texts):
+            return miss_sense_probs, miss_age_probs
+
+        sense_probs, age_probs = [None] * len(cleaned_texts), [None] * len(cleaned_texts)
+        for idx, entry in enumerate(cached):
+            if entry is not None:
+                sense_probs[idx] = torch.tensor(entry[0], dtype=torch.float32, device=self.device)
+                age_probs[idx] = torch.tensor(entry[1], dtype=torch.float32, device=self.device)
+        for row, idx in enumerate(miss_indices):
+            sense_probs[idx] = miss_sense_probs[row]
+            age_probs[idx] = miss_age_probs[row]
+        return torch.stack(sense_probs), torch.stack(age_probs)
+
+    def _forward_cleaned_batch(self, cleaned_texts: list[str], show_progress: bool = True):
+        """
+        Runs the model over already-cleaned texts, truncated to max_token_len or, with sliding_window,
+        as overlapping windows (see _tokenize_cleaned and _aggregate_windows).
+        """
+        all_input_ids, spans = self._tokenize_cleaned(cleaned_texts, self.tokenizer)
+        batches = self._collate_token_ids(all_input_ids, self.tokenizer)
+        sense_probs, age_probs = self._run_collated(batches, len(all_input_ids), show_progress)
+        return self._aggregate_windows(sense_probs, age_probs, spans)
+
+    def _window_starts(self, num_tokens: int) -> list[int]:
+        """Start offsets of token windows of token_budget tokens, overlapping by window_overlap, covering every token."""
+        step = self.token_budget - self.window_overlap
+        starts = list(range(0, max(num_tokens - self.token_budget, 0) + 1, step))
+        if starts[-1] + self.token_budget < num_tokens:
+            starts.append(num_tokens - self.token_budget)
+        return starts
+
+    def _tokenize_cleaned(self, cleaned_texts: list[str], tokenizer):
+        """
+        Token ids (special tokens included) of already-cleaned texts, truncated to max_token_len.
+        With sliding_window, each text is tokenized in full and cut into overlapping windows of at most
+        max_token_len tokens instead (a text within the budget is a single window, identical to the truncating
+        path); spans then holds the (first, end) window rows of every text, otherwise it is None.
+        """
+        if not self.sliding_window:
+            encodings = tokenizer(
+                cleaned_texts,
+                add_special_tokens=True,
+                max_length=self.max_token_len,
+                return_token_type_ids=False,
+                return_attention_mask=False,
+                truncation=True,
+            )
+            return encodings["input_ids"], None
+
+        encodings = tokenizer(
+            cleaned_texts,
+            add_special_tokens=False,
+            return_token_type_ids=False,
+            return_attention_mask=False,
+            verbose=False,
+        )
+        window_ids, spans = [], []
+        for token_ids in encodings["input_ids"]:
+            first_window = len(window_ids)
+            for start in self._window_starts(len(token_ids)):
+                window = token_ids[start:start + self.token_budget]
+                window_ids.append(tokenizer.build_inputs_with_special_tokens(window))
+            spans.append((first_window, len(window_ids)))
+        return window_ids, spans
+
+    def _aggregate_windows(self, window_sense_probs, window_age_probs, spans):
+        """
+        Combines the window probabilities of each text: their mean, or, per task, the distribution of the
+        most confident window. Without windowing (spans None, or one window per text) rows pass through.
+        """
+        if spans is None or len(spans) == len(window_sense_probs):
+            return window_sense_probs, window_age_probs
+
+        sense_probs, age_probs = [], []
+        for start, end in spans:
+            for window_probs, text_probs in ((window_sense_probs, sense_probs), (window_age_probs, age_probs)):
+                probs = window_probs[start:end]
+                if self.window_aggregation == "mean":
+                    text_probs.append(probs.mean(dim=0))
+                else:
+                    text_probs.append(probs[probs.max(dim=1).values.argmax()])
+        return torch.stack(sense_probs), torch.stack(age_probs)
+
+    def _collate_token_ids(self, all_input_ids: list[list[int]], tokenizer) -> list[tuple]:
+        """
+        Groups token id sequences into padded batches of batch_size: (row indices, input_ids, attention_mask).
+        Sequences are sorted by length first, so each batch is only padded to its own longest sequence
+        instead of max_length.
+        """
+        # Length buckets: neighbours in this order have similar lengths, so padding stays minimal
+        order = sorted(range(len(all_input_ids)), key=lambda idx: len(all_input_ids[idx]))
+        batches = []
+        for start in range(0, len(order), self.batch_size):
+            batch_indices = order[start:start + self.batch_size]
+            batch = tokenizer.pad(
+                {"input_ids": [all_input_ids[idx] for idx in batch_indices]},
+                padding="longest",
+                return_attention_mask=True,
+                return_tensors='pt',
+            )
+            batches.append((batch_indices, batch["input_ids"], batch["attention_mask"]))
+        return batches
+
+    def _run_collated(self, batches: list[tuple], num_sequences: int, show_progress: bool = True):
+        """Runs the model over batches from _collate_token_ids; returns probabilities in the original sequence order."""
+        sense_probs, age_probs = [None] * num_sequences, [None] * num_sequences
+        from tqdm import tqdm
+        for batch_indices, input_ids, attention_mask in tqdm(batches, desc="Running batched inference",
+                                                             disable=not show_progress):
+            with torch.no_grad():
+                sense_logits, age_logits = self.model(input_ids.to(self.device), attention_mask.to(self.device))
+
+            batch_sense_probs = torch.softmax(sense_logits, dim=1)
+            batch_age_probs = torch.softmax(age_logits, dim=1)
+            for row, idx in enumerate(batch_indices):
+                sense_probs[idx] = batch_sense_probs[row]
+                age_probs[idx] = batch_age_probs[row]
+
+        return torch.stack(sense_probs), torch.stack(age_probs)
+
+    def _worker_tokenizer(self):
+        """
+        The calling thread's own copy of the tokenizer. A fast tokenizer must not be shared between threads:
+        its truncation and padding settings are mutable state of the Rust object ("Already borrowed").
+        """
+        tokenizer = getattr(self._thread_state, "tokenizer", None)
+        if tokenizer is None:
+            tokenizer = self._thread_state.tokenizer = copy.deepcopy(self.tokenizer)
+        return tokenizer
+
+    def _prepare_batch(self, paragraphs: list[str]) -> dict:
+        """
+        Producer stage of the pipeline, run on a tokenizer thread: cleaning, prediction cache lookup,
+        tokenization and padding of one batch of paragraphs, everything short of the forward pass.
+        """
+        start_time = time.perf_counter()
+        tokenizer = self._worker_tokenizer()
+        cleaned_texts = clean_texts(paragraphs)
+        cached, miss_indices = self._lookup_cache(cleaned_texts)
+        all_input_ids, spans = [], None
+        if miss_indices:
+            # The fast tokenizer raises on an empty list, and a fully cached batch has nothing to encode
+            all_input_ids, spans = self._tokenize_cleaned([cleaned_texts[idx] for idx in miss_indices], tokenizer)
+        return {
+            "paragraphs": paragraphs,
+            "cleaned_texts": cleaned_texts,
+            "cached": cached,
+            "miss_indices": miss_indices,
+            "batches": self._collate_token_ids(all_input_ids, tokenizer),
+            "num_sequences": len(all_input_ids),
+            "spans": spans,
+            "seconds": time.perf_counter() - start_time,
+        }
+
+    def _iter_pipelined_results(self, paragraphs, last_prediction: dict = None, desc: str = "Pipelined inference"):
+        """
+        Producer/consumer inference over an iterable of paragraphs, yielding the decoded results batch by batch.
+        A producer thread pulls paragraphs (so chunking runs there too), groups them into batches of batch_size
+        and hands each batch to a pool of pipeline_workers tokenizer threads (_prepare_batch). The pending
+        batches wait, in order, in a queue of at most queue_depth entries, while this thread only runs the
+        model and decodes. The threads overlap with inference where the work releases the GIL: batch encoding of
+        the fast (Rust) tokenizer, which __init__ ensures, and torch's forward pass. Cleaning, chunking and padding
+        are Python code and hold it. Seconds spent per stage are collected in self.pipeline_stats:
+        producer_blocked_s grows when the encoder is the bottleneck, consumer_wait_s when it starves.
+        """
+        from tqdm import tqdm
+
+        stats = self.pipeline_stats = {
+            "batches": 0, "chunking_s": 0.0, "prepare_s": 0.0, "producer_blocked_s": 0.0,
+            "consumer_wait_s": 0.0, "forward_s": 0.0, "decode_s": 0.0,
+        }
+        pending = queue.Queue(maxsize=self.queue_depth)
+        stop = threading.Event()
+        executor = ThreadPoolExecutor(max_workers=self.pipeline_workers, thread_name_prefix="tokenize")
+
+        def put(item) -> bool:
+            start_time = time.perf_counter()
+            try:
+                # Time out regularly, so the producer notices when the consumer has stopped
+                while not stop.is_set():
+                    try:
+                        pending.put(item, timeout=0.1)
+                        return True
+                    except queue.Full:
+                        continue
+                return False
+            finally:
+                stats["producer_blocked_s"] += time.perf_counter() - start_time
+
+        def produce():
+            try:
+                batch, paragraph_iter = [], iter(paragraphs)
+                while True:
+                    start_time = time.perf_counter()
+                    paragraph = next(paragraph_iter, None)
+                    stats["chunking_s"] += time.perf_counter() - start_time
+                    if paragraph is not None:
+                        batch.append(paragraph)
+                    if batch and (paragraph is None or len(batch) >= self.batch_size):
+                        if not put(executor.submit(self._prepare_batch, batch)):
+                            return
+                        batch = []
+                    if paragraph is None:
+                        break
+            except Exception as e:
+                put(e)
+                return
+            put(_END_OF_STREAM)
+
+        producer = threading.Thread(target=produce, name="chunking", daemon=True)
+        producer.start()
+        try:
+            with tqdm(desc=desc, unit="paragraph") as progress:
+                while True:
+                    start_time = time.perf_counter()
+                    item = pending.get()
+                    if item is _END_OF_STREAM:
+                        break
+                    if isinstance(item, Exception):
+                        raise item
+                    prepared = item.result()
+                    stats["consumer_wait_s"] += time.perf_counter() - start_time
+                    stats["prepare_s"] += prepared["seconds"]
+
+                    start_time = time.perf_counter()
+                    miss_sense_probs = miss_age_probs = None
+                    if prepared["miss_indices"]:
+                        window_sense_probs, window_age_probs = self._run_collated(
+                            prepared["batches"], prepared["num_sequences"], show_progress=False
+                        )
+                        miss_sense_probs, miss_age_probs = self._aggregate_windows(
+                            window_sense_probs, window_age_probs, prepared["spans"]
+                        )
+                    sense_probs, age_probs = self._merge_predictions(
+                        prepared["cleaned_texts"], prepared["cached"], prepared["miss_indices"],
+                        miss_sense_probs, miss_age_probs
+                    )
+                    stats["forward_s"] += time.perf_counter() - start_time
+
+                    start_time = time.perf_counter()
+                    results = self._decode_predictions(prepared["paragraphs"], sense_probs, age_probs,
+                                                       last_prediction=last_prediction)
+                    last_prediction = results[-1]
+                    stats["decode_s"] += time.perf_counter() - start_time
+                    stats["batches"] += 1
+                    progress.update(len(results))
+                    yield results
+        finally:
+            stop.set()
+            producer.join()
+            executor.shutdown(wait=True, cancel_futures=True)
 
     @staticmethod
-    def _chunk_text(text: str, target_words: int = 128) -> list[str]:
-        """Splits text into chunks of ~target_words, without breaking sentences."""
-        text = text.replace('\n', ' ').strip()
-        sentences = re.split(r'(?<=[.!?])\s+', text)
-        if not sentences: return []
-        chunks, current_chunk_sentences = [], []
-        for sentence in sentences:
-            if not sentence: continue
-            current_chunk_sentences.append(sentence)
-            temp_chunk_text = " ".join(current_chunk_sentences)
-            if len(temp_chunk_text.split()) >= target_words:
-                chunks.append(temp_chunk_text)
-                current_chunk_sentences = []
-        if current_chunk_sentences: chunks.append(" ".join(current_chunk_sentences))
-        return chunks
+    def _best_allowed_classes(probabilities: torch.Tensor, allowed_ids: set = None):
+        """
+        Highest-confidence allowed class of every row at once: probabilities of classes outside allowed_ids are
+        masked out before a single argmax. Returns (class_ids, confidences); if no allowed ID is a valid class,
+        every row gets class -1 with confidence 0.
+        """
+        if allowed_ids:
+            num_rows, num_classes = probabilities.shape
+            valid_ids = [idx for idx in allowed_ids if 0 <= idx < num_classes]
+            if not valid_ids:
+                return (torch.full((num_rows,), -1, dtype=torch.long, device=probabilities.device),
+                        torch.zeros(num_rows, dtype=probabilities.dtype, device=probabilities.device))
+            allowed_mask = torch.zeros(num_classes, dtype=torch.bool, device=probabilities.device)
+            allowed_mask[valid_ids] = True
+            probabilities = probabilities.masked_fill(~allowed_mask, -1.0)
+        confidences, class_ids = probabilities.max(dim=1)
+        return class_ids, confidences
+
+    def _fallback_sources(self, confidences: torch.Tensor, has_previous: bool) -> torch.Tensor:
+        """
+        Vectorized confidence-threshold fallback: each row takes the prediction of the latest row at or before it
+        whose confidence reaches the threshold (a forward fill via cummax). The first row keeps its own prediction
+        unless a previous batch left one; -1 marks rows that fall back to that previous prediction.
+        """
+        # float64: the threshold is a Python float, and a float32 comparison could round it across a confidence
+        confident = confidences.double() >= self.confidence_threshold
+        if not has_previous:
+            confident[0] = True
+        rows = torch.arange(len(confidences), device=confidences.device)
+        return torch.where(confident, rows, torch.full_like(rows, -1)).cummax(dim=0).values
 
-    def process_text_content(self, text_content: str, title: str = "Untitled") -> dict:
-        """Processes a raw text string and returns the analysis as a dictionary."""
-        print(f"Processing document titled: '{title}'")
-        paragraphs = self._chunk_text(text_content)
-        print(f"Split text into {len(paragraphs)} paragraphs.")
+    @staticmethod
+    def _prediction_dict(class_id: int, confidence: float, id_to_name_map: dict) -> dict:
+        if class_id < 0:
+            return {"class_name": "No allowed class found", "class_id": -1, "confidence": 0.0}
+        return {"class_name": id_to_name_map.get(class_id, "Unknown"), "class_id": class_id, "confidence": confidence}
 
-        all_results = []
-        last_successful_prediction = None
+    @staticmethod
+    def _iter_sentences(text_blocks):
+        """
+        Yields the sentences that _chunk_text splits a text into, from an iterable of consecutive text blocks.
+        Only the current, unfinished sentence is buffered, so a file can be streamed block by block.
+        """
+        buffer = ""
+        for block in text_blocks:
+            block = block.replace('\n', ' ')
+            # An empty buffer sits at the document start or right after a sentence boundary, where
+            # leading whitespace is part of the separator (or stripped) rather than of the next sentence
+            buffer += block.lstrip() if not buffer else block
+            if not buffer:
+                continue
+            parts = SENTENCE_BOUNDARY.split(buffer)
+            # The last part may still continue in the next block
+            for sentence in parts[:-1]:
+                if sentence: yield sentence
+            buffer = parts[-1]
+        buffer = buffer.rstrip()
+        if buffer: yield buffer
 
-        for i, text_paragraph in enumerate(tqdm(paragraphs, desc=f"Analyzing paragraphs for '{title}'")):
-            sense_probs, age_probs = self._predict_with_probabilities(text_paragraph)
+    @staticmethod
+    def _iter_chunks(text_blocks, target_words: int = 128):
+        """Generator version of _chunk_text over an iterable of text blocks."""
+        current_chunk_sentences, current_word_count = [], 0
+        for sentence in DocumentProcessor._iter_sentences(text_blocks):
+            current_chunk_sentences.append(sentence)
+            # Sentences are joined with single spaces, so word counts simply add up
+            current_word_count += len(sentence.split())
+            if current_word_count >= target_words:
+                yield " ".join(current_chunk_sentences)
+                current_chunk_sentences, current_word_count = [], 0
+        if current_chunk_sentences: yield " ".join(current_chunk_sentences)
 
-            sense_pred = self._get_best_allowed_prediction(sense_probs, self.sense_id_to_name, self.allowed_sense_ids)
-            age_pred = self._get_best_allowed_prediction(age_probs, self.age_id_to_name, self.allowed_age_ids)
+    @staticmethod
+    def _chunk_text(text: str, target_words: int = 128) -> list[str]:
+        """Splits text into chunks of ~target_words, without breaking sentences."""
+        return list(DocumentProcessor._iter_chunks([text], target_words))
+
+    def _iter_token_chunks(self, text_blocks):
+        """
+        Token-aware counterpart of _iter_chunks: whole sentences are packed while the cleaned chunk still
+        fits the token budget, so the model sees all of it. A single sentence over the budget forms its own
+        chunk (truncated, or windowed with sliding_window).
+        """
+        current_chunk_sentences, current_token_count = [], 0
+        for sentence in self._iter_sentences(text_blocks):
+            cleaned_sentence = clean_text(sentence)
+            # Byte-level BPE splits before spaces, so a space-joined chunk costs the sum of its
+            # sentences tokenized with a leading space (an upper bound for the first one)
+            sentence_tokens = len(self.tokenizer.tokenize(" " + cleaned_sentence)) if cleaned_sentence else 0
+            if current_chunk_sentences and current_token_count + sentence_tokens > self.token_budget:
+                yield " ".join(current_chunk_sentences)
+                current_chunk_sentences, current_token_count = [], 0
+            current_chunk_sentences.append(sentence)
+            current_token_count += sentence_tokens
+        if current_chunk_sentences: yield " ".join(current_chunk_sentences)
 
-            # Apply confidence threshold logic (for paragraphs after the first one)
-            if i > 0 and last_successful_prediction:
-                if sense_pred["confidence"] < self.confidence_threshold:
-                    sense_pred = last_successful_prediction["sense_prediction"]
-                if age_pred["confidence"] < self.confidence_threshold:
-                    age_pred = last_successful_prediction["age_prediction"]
+    def _iter_paragraphs(self, text_blocks):
+        """The paragraphs this processor classifies: token-aware chunks with token_chunking, else ~128-word chunks."""
+        return self._iter_token_chunks(text_blocks) if self.token_chunking else self._iter_chunks(text_blocks)
 
+    def split_paragraphs(self, text: str) -> list[str]:
+        """Splits a whole text into the paragraphs that process_text_content classifies."""
+        return list(self._iter_paragraphs([text]))
+
+    def _decode_predictions(self, paragraphs: list[str], sense_probs, age_probs,
+                            last_prediction: dict = None) -> list[dict]:
+        """
+        Turns per-paragraph probabilities into results, applying the allowed-class filters and the
+        sequential confidence-threshold fallback to the previous paragraph's prediction.
+        Both are whole-batch tensor operations (masked argmax, forward fill); only building the result
+        dicts loops in Python. `last_prediction` carries the fallback state over from a previous batch.
+        """
+        if not paragraphs:
+            return []
+        sense_probs = sense_probs if torch.is_tensor(sense_probs) else torch.stack(list(sense_probs))
+        age_probs = age_probs if torch.is_tensor(age_probs) else torch.stack(list(age_probs))
+
+        sense_ids, sense_confidences = self._best_allowed_classes(sense_probs, self.allowed_sense_ids)
+        age_ids, age_confidences = self._best_allowed_classes(age_probs, self.allowed_age_ids)
+        sense_sources = self._fallback_sources(sense_confidences, bool(last_prediction))
+        age_sources = self._fallback_sources(age_confidences, bool(last_prediction))
+
+        # The only device-to-host transfer; float64 represents the IDs and float32 confidences exactly
+        rows = torch.stack([
+            sense_ids.double(), sense_confidences.double(), sense_sources.double(),
+            age_ids.double(), age_confidences.double(), age_sources.double(),
+        ], dim=1).cpu().tolist()
+
+        own_sense = [self._prediction_dict(int(row[0]), row[1], self.sense_id_to_name) for row in rows]
+        own_age = [self._prediction_dict(int(row[3]), row[4], self.age_id_to_name) for row in rows]
+        all_results = []
+        for text_paragraph, row in zip(paragraphs, rows):
+            sense_source, age_source = int(row[2]), int(row[5])
             # Construct the final result for this paragraph (without cleaned_text)
-            final_result = {
+            all_results.append({
                 "text": text_paragraph,
-                "sense_prediction": sense_pred,
-                "age_prediction": age_pred
-            }
-            all_results.append(final_result)
-            last_successful_prediction = final_result
+                "sense_prediction": own_sense[sense_source] if sense_source >= 0 else last_prediction["sense_prediction"],
+                "age_prediction": own_age[age_source] if age_source >= 0 else last_prediction["age_prediction"]
+            })
+        return all_results
 
+    def process_text_content(self, text_content: str, title: str = "Untitled") -> dict:
+        """Processes a raw text string and returns the analysis as a dictionary."""
+        print(f"Processing document titled: '{title}'")
+        if self.pipeline_workers:
+            # Chunking happens on the producer thread, overlapped with tokenization and inference
+            batches = self._iter_pipelined_results(self._iter_paragraphs([text_content]),
+                                                   desc=f"Analyzing paragraphs for '{title}'")
+            all_results = list(itertools.chain.from_iterable(batches))
+            print(f"Split text into {len(all_results)} paragraphs.")
+            print(f"Pipeline stage timings: {self.pipeline_stats}")
+            if self.cache is not None:
+                print(f"Prediction cache stats: {self.cache.stats()}")
+            return {'title': title, 'paragraphs': all_results}
+
+        paragraphs = self.split_paragraphs(text_content)
+        print(f"Split text into {len(paragraphs)} paragraphs.")
+        if not paragraphs:
+            return {'title': title, 'paragraphs': []}
+
+        # The single-paragraph path truncates, so windowing always goes through the batched one
+        if self.batch_size > 1 or self.cache is not None or self.sliding_window:
+            sense_probs, age_probs = self._predict_batch_with_probabilities(paragraphs)
+        else:
+            from tqdm import tqdm
+            sense_probs, age_probs = [], []
+            for text_paragraph in tqdm(paragraphs, desc=f"Analyzing paragraphs for '{title}'"):
+                paragraph_sense_probs, paragraph_age_probs = self._predict_with_probabilities(text_paragraph)
+                sense_probs.append(paragraph_sense_probs)
+                age_probs.append(paragraph_age_probs)
+
+        all_results = self._decode_predictions(paragraphs, sense_probs, age_probs)
+        if self.cache is not None:
+            print(f"Prediction cache stats: {self.cache.stats()}")
         return {'title': title, 'paragraphs': all_results}
 
+    @staticmethod
+    def _read_stream_cursor(output_path: Path):
+        """
+        Inspects a JSON Lines output of process_file_streaming left by an earlier run.
+        Returns (header, paragraphs_done, last_result), header being None if there is none.
+        A trailing partial line from a crash is truncated.
+        """
+        if not output_path.exists():
+            return None, 0, None
+        header, paragraphs_done, last_result, valid_bytes = None, 0, None, 0
+        with open(output_path, 'rb') as f:
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    break
+                if 'paragraph_index' in record:
+                    paragraphs_done, last_result = record['paragraph_index'] + 1, record
+                else:
+                    header = record
+                valid_bytes += len(line)
+        if valid_bytes < output_path.stat().st_size:
+            with open(output_path, 'r+b') as f:
+                f.truncate(valid_bytes)
+        if last_result is not None:
+            del last_result['paragraph_index']
+        return header, paragraphs_done, last_result
+
+    def _stream_header(self, input_file: str, title: str) -> dict:
+        """
+        Header line of a process_file_streaming output: the title plus everything the paragraph indices depend
+        on, i.e. the identity of the input file (resolved path, size, modification time) and the chunking.
+        """
+        path = Path(input_file).resolve()
+        stat = path.stat()
+        return {
+            'title': title,
+            'source': {'path': str(path), 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns},
+            'chunking': {'token_budget': self.token_budget} if self.token_chunking else 'words',
+        }
+
+    def process_file_streaming(self, input_file: str, output_file: str, title: str = None,
+                               block_size: int = 1 << 16) -> int:
+        """
+        Streams a text file through chunking and inference with bounded memory.
+        The input is read in blocks, paragraphs are classified batch by batch, and each result is appended to
+        `output_file` as one JSON line (after a header line, see _stream_header) as soon as its batch is done.
+        If `output_file` already holds results of an interrupted run on the same input file, title and chunking,
+        processing resumes after the last complete paragraph, with the same fallback state, since chunking is
+        deterministic. Output of a different run is overwritten from the start.
+        Returns the number of paragraphs written by this call.
+        """
+        title = title or Path(input_file).stem
+        output_path = Path(output_file)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        expected_header = self._stream_header(input_file, title)
+        header, paragraphs_done, last_prediction = self._read_stream_cursor(output_path)
+        if (header is not None or paragraphs_done) and header != expected_header:
+            # Paragraph indices into a different input (or different chunking) would skip the wrong paragraphs
+            print(f"Warning: {output_file} was not written for this input file, title and chunking; "
+                  f"restarting '{title}' from the beginning.")
+            output_path.unlink()
+            header, paragraphs_done, last_prediction = None, 0, None
+        if paragraphs_done:
+            print(f"Resuming '{title}' after {paragraphs_done} already processed paragraphs.")
+
+        paragraphs_written = 0
+        with open(input_file, encoding='utf-8') as src, open(output_path, 'a', encoding='utf-8') as out:
+            if header is None:
+                out.write(json.dumps(expected_header, ensure_ascii=False) + '\n')
+
+            def write_results(results: list[dict]):
+                nonlocal last_prediction, paragraphs_written
+                for result in results:
+                    record = {'paragraph_index': paragraphs_done + paragraphs_written, **result}
+                    out.write(json.dumps(record, ensure_ascii=False) + '\n')
+                    paragraphs_written += 1
+                out.flush()
+                os.fsync(out.fileno())
+                last_prediction = results[-1]
+
+            def write_batch(batch: list[str]):
+                sense_probs, age_probs = self._predict_batch_with_probabilities(batch, show_progress=False)
+                write_results(self._decode_predictions(batch, sense_probs, age_probs, last_prediction=last_prediction))
+
+            blocks = iter(lambda: src.read(block_size), '')
+            paragraphs = itertools.islice(self._iter_paragraphs(blocks), paragraphs_done, None)
+            if self.pipeline_workers:
+                # Reading and chunking the file happen on the pipeline's producer thread
+                for results in self._iter_pipelined_results(paragraphs, last_prediction=last_prediction,
+                                                            desc=f"Streaming paragraphs for '{title}'"):
+                    write_results(results)
+            else:
+                from tqdm import tqdm
+                batch = []
+                for paragraph in tqdm(paragraphs, desc=f"Streaming paragraphs for '{title}'", unit="paragraph"):
+                    batch.append(paragraph)
+                    if len(batch) >= self.batch_size:
+                        write_batch(batch)
+                        batch = []
+                if batch:
+                    write_batch(batch)
+
+        print(f"Wrote {paragraphs_written} paragraphs to: {output_file}")
+        if self.pipeline_workers:
+            print(f"Pipeline stage timings: {self.pipeline_stats}")
+        return paragraphs_written
+
     @staticmethod
     def save_to_json(data: dict, output_file_path: str):
         """Saves a dictionary to a JSON file."""
@@ -206,27 +793,69 @@ if __name__ == '__main__':
                         help="Comma-separated list of allowed sense class IDs (e.g., '2,3').")
     parser.add_argument("--allowed_ages", type=str, default=None,
                         help="Comma-separated list of allowed age class IDs (e.g., '0,1').")
+    parser.add_argument("--batch_size", type=int, default=1,
+                        help="Paragraphs per forward pass; values above 1 enable batched, length-bucketed inference.")
+    parser.add_argument("--backend", type=str, choices=["torch", "onnx"], default="torch",
+                        help="Inference backend; with 'onnx', --checkpoint_path is an onnx_backend.py export directory.")
+    parser.add_argument("--sliding_window", action="store_true",
+                        help="Classify paragraphs longer than the token budget as overlapping windows instead of truncating them.")
+    parser.add_argument("--window_overlap", type=int, default=32, help="Tokens shared by neighbouring windows.")
+    parser.add_argument("--window_aggregation", type=str, choices=["mean", "max"], default="mean",
+                        help="Combine window probabilities by their mean or keep the most confident window.")
+    parser.add_argument("--token_chunking", action="store_true",
+                        help="Size paragraphs to the model's token budget instead of ~128 words.")
+    parser.add_argument("--quantize", action="store_true",
+                        help="Use the dynamic INT8 quantized model on CPU (created next to the checkpoint on first use).")
+    parser.add_argument("--pipeline_workers", type=int, default=0,
+                        help="Tokenizer threads feeding the model from a background producer; 0 disables pipelining.")
+    parser.add_argument("--queue_depth", type=int, default=4,
+                        help="Prepared batches the pipeline may hold ahead of the model.")
+    parser.add_argument("--torch_threads", type=int, default=None,
+                        help="torch intra-op threads; leave cores for the pipeline's tokenizer threads.")
+    parser.add_argument("--stream", action="store_true",
+                        help="Stream the input and write one JSON line per paragraph as it is classified; "
+                             "re-running with the same output file resumes an interrupted job.")
+    parser.add_argument("--cache_path", type=str, default=None,
+                        help="Path to an on-disk cache of paragraph probabilities (SQLite file); disabled if omitted.")
+    parser.add_argument("--cache_max_entries", type=int, default=100_000,
+                        help="Maximum number of cached paragraphs before least recently used ones are evicted.")
     args = parser.parse_args()
 
     try:
         # Convert comma-separated ID strings to lists of integers
         allowed_senses_ids = [int(id_str) for id_str in args.allowed_senses.split(',')] if args.allowed_senses else None
         allowed_ages_ids = [int(id_str) for id_str in args.allowed_ages.split(',')] if args.allowed_ages else None
+        if args.torch_threads:
+            torch.set_num_threads(args.torch_threads)
 
         processor = DocumentProcessor(
             checkpoint_path=args.checkpoint_path,
             confidence_threshold=args.threshold,
             allowed_senses=allowed_senses_ids,
-            allowed_ages=allowed_ages_ids
+            allowed_ages=allowed_ages_ids,
+            batch_size=args.batch_size,
+            cache_path=args.cache_path,
+            cache_max_entries=args.cache_max_entries,
+            quantize=args.quantize,
+            backend=args.backend,
+            sliding_window=args.sliding_window,
+            window_overlap=args.window_overlap,
+            window_aggregation=args.window_aggregation,
+            token_chunking=args.token_chunking,
+            pipeline_workers=args.pipeline_workers,
+            queue_depth=args.queue_depth
         )
 
-        text_content = Path(args.input_file).read_text(encoding='utf-8')
-        results = processor.process_text_content(
-            text_content,
-            title=args.title or Path(args.input_file).stem
-        )
+        if args.stream:
+            processor.process_file_streaming(args.input_file, args.output_file, title=args.title)
+        else:
+            text_content = Path(args.input_file).read_text(encoding='utf-8')
+            results = processor.process_text_content(
+                text_content,
+                title=args.title or Path(args.input_file).stem
+            )
 
-        processor.save_to_json(data=results, output_file_path=args.output_file)
+            processor.save_to_json(data=results, output_file_path=args.output_file)
 
         print("\n--- Process finished successfully ---")
 
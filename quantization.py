@@ -0,0 +1,64 @@
+import os
+import tempfile
+from pathlib import Path
+
+import torch
+from torch import nn
+
+from result_cache import checkpoint_identity
+
+
+def quantize_model(model: nn.Module) -> nn.Module:
+    """
+    Applies PyTorch dynamic INT8 quantization to every nn.Linear of the model, which covers the RoBERTa
+    encoder layers, the pooler and both ClassificationHeads. Weights are stored as int8; activations are
+    quantized on the fly, so no calibration data is needed. CPU only.
+    """
+    return torch.quantization.quantize_dynamic(model, {nn.Linear}, dtype=torch.qint8)
+
+
+def quantized_artifact_path(checkpoint_path: str) -> Path:
+    return Path(checkpoint_path).with_suffix(".int8.pt")
+
+
+def load_quantized_model(checkpoint_path: str, artifact_path: str = None):
+    """
+    Returns the dynamically quantized CPU model for a checkpoint.
+    The quantized module is persisted next to the checkpoint (or at `artifact_path`) together with the
+    checkpoint identity, so later startups load it directly instead of loading and re-quantizing the
+    fp32 weights. A stale artifact (checkpoint replaced since) is rebuilt.
+    """
+    artifact_path = Path(artifact_path) if artifact_path else quantized_artifact_path(checkpoint_path)
+    # checkpoint_path may also be an inference artifact directory (see network.export_inference_artifact)
+    identity = checkpoint_identity(checkpoint_path)
+
+    if artifact_path.exists():
+        # The artifact pickles the whole module, so it needs the same model code to load
+        artifact = torch.load(artifact_path, map_location="cpu", weights_only=False)
+        # Artifacts pickled before the switch to the fast tokenizer carry the slow one; rebuild those too
+        if artifact.get("checkpoint_identity") == identity and getattr(artifact["model"].tokenizer, "is_fast", False):
+            print(f"Loaded quantized model from: {artifact_path}")
+            return artifact["model"]
+        print(f"Quantized artifact {artifact_path} is stale, rebuilding it.")
+
+    from network import is_inference_artifact, load_inference_model
+    if is_inference_artifact(checkpoint_path):
+        model = load_inference_model(checkpoint_path)
+    else:
+        from model import RoBERTaMultiTaskClassifier
+        model = RoBERTaMultiTaskClassifier.load_from_checkpoint(checkpoint_path=checkpoint_path, map_location="cpu")
+        model.freeze()
+        model.eval()
+    model = quantize_model(model)
+    # Written under a temporary name and renamed into place: concurrent workers (batch_process.py) either see
+    # no artifact or a complete one, never a half-written file
+    fd, tmp_path = tempfile.mkstemp(prefix=artifact_path.name + ".", suffix=".tmp", dir=artifact_path.parent)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            torch.save({"checkpoint_identity": identity, "model": model}, f)
+        os.replace(tmp_path, artifact_path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    print(f"Saved quantized model to: {artifact_path}")
+    return model
@@ -0,0 +1,172 @@
+import hashlib
+import json
+import sqlite3
+import struct
+import threading
+import time
+from array import array
+from pathlib import Path
+
+
+def checkpoint_identity(checkpoint_path: str) -> str:
+    """
+    A cheap identity for a model file: its resolved path, size and modification time.
+    Retraining or replacing the checkpoint changes the identity and therefore every cache key.
+    For an export directory (ONNX or inference artifact) every file in it contributes.
+    """
+    path = Path(checkpoint_path).resolve()
+    if path.is_dir():
+        return ";".join(checkpoint_identity(str(child)) for child in sorted(path.iterdir()) if child.is_file())
+    stat = path.stat()
+    return f"{path}:{stat.st_size}:{stat.st_mtime_ns}"
+
+
+class DiskLRUCache:
+    """
+    A size-bounded key/value store on disk with least-recently-used eviction, backed by SQLite.
+    Keys are strings, values are raw bytes. Hit and miss counters are kept for the lifetime of the object.
+    """
+
+    def __init__(self, cache_path: str, max_entries: int = 100_000):
+        self.cache_path = Path(cache_path)
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.cache_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, value BLOB NOT NULL, last_access INTEGER NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_last_access ON entries(last_access)")
+        self._conn.commit()
+
+    def get_many(self, keys: list[str]) -> dict:
+        """Returns {key: value} for the keys present in the cache and marks them as recently used."""
+        if not keys:
+            return {}
+        found = {}
+        unique_keys = list(dict.fromkeys(keys))
+        with self._lock:
+            # SQLite limits the number of bound parameters per statement
+            for start in range(0, len(unique_keys), 500):
+                part = unique_keys[start:start + 500]
+                placeholders = ",".join("?" * len(part))
+                rows = self._conn.execute(f"SELECT key, value FROM entries WHERE key IN ({placeholders})", part)
+                found.update(rows.fetchall())
+            if found:
+                now = time.time_ns()
+                self._conn.executemany("UPDATE entries SET last_access = ? WHERE key = ?",
+                                       [(now, key) for key in found])
+                self._conn.commit()
+            self.hits += sum(1 for key in keys if key in found)
+            self.misses += sum(1 for key in keys if key not in found)
+        return found
+
+    def put_many(self, items: dict):
+        """Stores {key: value} pairs, then evicts the least recently used entries beyond max_entries."""
+        if not items:
+            return
+        now = time.time_ns()
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO entries (key, value, last_access) VALUES (?, ?, ?)",
+                                   [(key, value, now) for key, value in items.items()])
+            overflow = self._count() - self.max_entries
+            if overflow > 0:
+                self._conn.execute(
+                    "DELETE FROM entries WHERE key IN (SELECT key FROM entries ORDER BY last_access ASC LIMIT ?)",
+                    (overflow,)
+                )
+            self._conn.commit()
+
+    def _count(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = self._count()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": entries,
+            "max_entries": self.max_entries,
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class PredictionCache(DiskLRUCache):
+    """
+    Caches the full sense/age probability vectors of cleaned paragraphs.
+    Keys combine the cleaned text with the model identity and max_token_len, so a cached entry is only
+    reused for exactly the same model input. Since whole distributions are stored, allowed-class filters
+    and confidence thresholds can change freely without invalidating the cache.
+    """
+
+    def __init__(self, cache_path: str, model_identity: str, max_token_len: int, max_entries: int = 100_000):
+        super().__init__(cache_path, max_entries=max_entries)
+        self.model_identity = model_identity
+        self.max_token_len = max_token_len
+
+    def _key(self, cleaned_text: str) -> str:
+        raw = f"{self.model_identity}\0{self.max_token_len}\0{cleaned_text}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _encode(sense_probs: list[float], age_probs: list[float]) -> bytes:
+        # float32 storage is lossless for probabilities produced by a float32 model
+        return struct.pack("<I", len(sense_probs)) + array("f", sense_probs).tobytes() + array("f", age_probs).tobytes()
+
+    @staticmethod
+    def _decode(value: bytes):
+        n_sense = struct.unpack_from("<I", value)[0]
+        probs = array("f")
+        probs.frombytes(value[4:])
+        return probs[:n_sense].tolist(), probs[n_sense:].tolist()
+
+    def get_predictions(self, cleaned_texts: list[str]) -> list:
+        """Returns one (sense_probs, age_probs) pair of float lists per text, or None where it is not cached."""
+        keys = [self._key(text) for text in cleaned_texts]
+        found = self.get_many(keys)
+        return [self._decode(found[key]) if key in found else None for key in keys]
+
+    def put_predictions(self, cleaned_texts: list[str], sense_probs: list[list[float]], age_probs: list[list[float]]):
+        self.put_many({
+            self._key(text): self._encode(sense, age)
+            for text, sense, age in zip(cleaned_texts, sense_probs, age_probs)
+        })
+
+
+class ReaderAnswerCache(DiskLRUCache):
+    """
+    Caches the raw answers of an extractive QA reader per (context, question), before any filtering.
+    Keys combine a hash of the context and the question with the reader identity (model files and reader
+    settings), so entity rules and answer scoring can change freely and be re-applied to cached answers.
+    Each value is a JSON list of {"data", "score", "start", "end", "meta"} records.
+    """
+
+    def __init__(self, cache_path: str, reader_identity: str, max_entries: int = 200_000):
+        super().__init__(cache_path, max_entries=max_entries)
+        self.reader_identity = reader_identity
+
+    def _key(self, context: str, question: str) -> str:
+        context_hash = hashlib.sha256(context.encode("utf-8")).hexdigest()
+        raw = f"{self.reader_identity}\0{question}\0{context_hash}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get_answers(self, pairs: list[tuple[str, str]]) -> list:
+        """Returns the answer records of each (context, question) pair, or None where it is not cached."""
+        keys = [self._key(context, question) for context, question in pairs]
+        found = self.get_many(keys)
+        return [json.loads(found[key]) if key in found else None for key in keys]
+
+    def put_answers(self, pairs: list[tuple[str, str]], answer_records: list[list[dict]]):
+        self.put_many({
+            self._key(context, question): json.dumps(records).encode("utf-8")
+            for (context, question), records in zip(pairs, answer_records)
+        })
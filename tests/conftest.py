@@ -0,0 +1,29 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+# The project is a set of top-level modules rather than a package
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+@pytest.fixture
+def make_fast_tokenizer():
+    """
+    Builds a small in-memory word-level fast tokenizer over the words of the given texts, with RoBERTa's special
+    tokens, so tests need no downloaded vocabulary. Unknown words map to <unk>.
+    """
+    tokenizers = pytest.importorskip("tokenizers")
+    transformers = pytest.importorskip("transformers")
+
+    def make(texts: list[str]):
+        words = sorted({word for text in texts for word in text.split()})
+        vocab = {token: idx for idx, token in enumerate(["<s>", "<pad>", "</s>", "<unk>"] + words)}
+        backend = tokenizers.Tokenizer(tokenizers.models.WordLevel(vocab, unk_token="<unk>"))
+        backend.pre_tokenizer = tokenizers.pre_tokenizers.Whitespace()
+        backend.post_processor = tokenizers.processors.TemplateProcessing(
+            single="<s> $A </s>", special_tokens=[("<s>", vocab["<s>"]), ("</s>", vocab["</s>"])]
+        )
+        return transformers.PreTrainedTokenizerFast(tokenizer_object=backend, bos_token="<s>", eos_token="</s>",
+                                                    pad_token="<pad>", unk_token="<unk>")
+    return make
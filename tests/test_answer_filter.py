@@ -0,0 +1,69 @@
+import random
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("torch")
+pytest.importorskip("haystack")
+
+from ROAST import AnswerFilter
+from benchmark import _pairwise_answer_filter, _random_answers
+
+
+def answer(data, score, start=None, end=None):
+    meta = {} if start is None else {"start": start, "end": end}
+    return SimpleNamespace(data=data, score=score, meta=meta)
+
+
+def kept_by_both(answers: list) -> tuple[list, list]:
+    """Answers kept by the pairwise reference and by the indexed AnswerFilter.run, as object ids in output order."""
+    answer_filter = AnswerFilter()
+    expected = [id(ans) for ans in _pairwise_answer_filter(answer_filter, answers)]
+    actual = [id(ans) for ans in answer_filter.run(answers=answers)["filtered_answers"]]
+    return expected, actual
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_randomized_answers_match_pairwise_filter(seed):
+    rng = random.Random(seed)
+    for _ in range(400):
+        answers = _random_answers(rng, rng.randint(0, 120), rng.randint(1, 200))
+        expected, actual = kept_by_both(answers)
+        assert actual == expected
+
+
+def test_answers_without_data_are_dropped_and_without_offsets_are_kept():
+    no_data = answer(None, 0.9, 0, 5)
+    no_offsets = answer("dragon", 0.8)
+    half_offsets = SimpleNamespace(data="dragon", score=0.7, meta={"start": 0})
+    spanned = answer("dragon", 0.6, 0, 5)
+    answers = [no_data, no_offsets, half_offsets, spanned]
+    expected, actual = kept_by_both(answers)
+    assert actual == expected == [id(no_offsets), id(half_offsets), id(spanned)]
+
+
+def test_tied_scores_keep_input_order():
+    first, second, third = answer("abc", 0.5, 10, 13), answer("abc", 0.5, 11, 12), answer("xyz", 0.5, 20, 23)
+    expected, actual = kept_by_both([first, second, third])
+    assert actual == expected == [id(first), id(third)]
+
+
+def test_identical_spans_keep_only_the_best():
+    best, duplicate = answer("sword", 0.9, 4, 9), answer("sword", 0.4, 4, 9)
+    expected, actual = kept_by_both([duplicate, best])
+    assert actual == expected == [id(best)]
+
+
+@pytest.mark.parametrize("document_length", [1, 7, 200])
+def test_nested_spans_at_document_edges(document_length):
+    end = document_length
+    answers = [
+        answer("whole", 0.3, 0, end),
+        answer("head", 0.9, 0, min(3, end)),
+        answer("tail", 0.8, max(end - 3, 0), end),
+        answer("first", 0.7, 0, 0),
+        answer("last", 0.6, end, end),
+        answer("outer", 0.5, 0, end + 5),
+    ]
+    expected, actual = kept_by_both(answers)
+    assert actual == expected
@@ -0,0 +1,45 @@
+import random
+
+import pytest
+
+for module in ("numpy", "pandas", "sklearn", "torch", "transformers", "pytorch_lightning"):
+    pytest.importorskip(module)
+data_utilities = pytest.importorskip("lightning_fabric.utilities.data")
+
+from torch.utils.data import DataLoader
+
+from dataset import LengthGroupedBatchSampler
+
+
+def epoch_batches(loader: DataLoader, epoch: int) -> list[list[int]]:
+    """The batches of one epoch, after the set_epoch call Lightning's fit loop makes before every epoch."""
+    data_utilities._set_sampler_epoch(loader, epoch)
+    return [list(batch) for batch in loader.batch_sampler]
+
+
+@pytest.mark.parametrize("num_replicas", [1, 3])
+def test_epochs_reshuffle_and_cover_every_index(num_replicas):
+    rng = random.Random(0)
+    lengths = [rng.randint(1, 128) for _ in range(1000)]
+    loaders = [
+        DataLoader(list(range(len(lengths))), batch_sampler=LengthGroupedBatchSampler(
+            lengths, batch_size=16, shuffle=True, bucket_size_multiplier=4, seed=42,
+            num_replicas=num_replicas, rank=rank,
+        ))
+        for rank in range(num_replicas)
+    ]
+
+    epochs = []
+    for epoch in range(2):
+        per_rank = [epoch_batches(loader, epoch) for loader in loaders]
+        assert len({len(batches) for batches in per_rank}) == 1
+        indices = [idx for batches in per_rank for batch in batches for idx in batch]
+        # Every index exactly once, apart from the batches repeated to even out the ranks
+        assert set(indices) == set(range(len(lengths)))
+        if num_replicas == 1:
+            assert sorted(indices) == list(range(len(lengths)))
+        epochs.append(per_rank)
+
+    assert epochs[0] != epochs[1]
+    for rank in range(num_replicas):
+        assert epochs[0][rank] != epochs[1][rank]
@@ -0,0 +1,44 @@
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("onnxruntime")
+pytest.importorskip("onnx")
+transformers = pytest.importorskip("transformers")
+
+from network import MultiTaskNetwork
+from onnx_backend import OnnxClassifier, compare_logits, export_model_onnx
+from process_document import AGE_CLASSES, SENSE_CLASSES
+
+MAX_TOKEN_LEN = 32
+TOLERANCE = 1e-3
+TEXTS = [
+    "The legions marched through the burning city as the drums of war echoed.",
+    "She read his letter again under the moonlight.",
+    "The starship drifted silently past the rings of the gas giant, its engines humming.",
+    "Words the tokenizer has never seen",
+]
+
+
+@pytest.fixture(scope="module")
+def tiny_model():
+    """A randomly initialized two-layer encoder with both heads, small enough to export in seconds."""
+    torch.manual_seed(0)
+    config = transformers.RobertaConfig(
+        vocab_size=64, hidden_size=32, num_hidden_layers=2, num_attention_heads=2, intermediate_size=64,
+        max_position_embeddings=MAX_TOKEN_LEN + 2, pad_token_id=1, bos_token_id=0, eos_token_id=2,
+    )
+    model = MultiTaskNetwork(config, len(SENSE_CLASSES), len(AGE_CLASSES), max_token_len=MAX_TOKEN_LEN)
+    return model.eval()
+
+
+def test_exported_logits_match_torch(tiny_model, make_fast_tokenizer, tmp_path):
+    tiny_model.tokenizer = make_fast_tokenizer(TEXTS[:3])
+    assert len(tiny_model.tokenizer) <= tiny_model.roberta.config.vocab_size
+
+    export_model_onnx(tiny_model, MAX_TOKEN_LEN, tmp_path)
+    parity = compare_logits(tiny_model, OnnxClassifier(tmp_path), TEXTS, tolerance=TOLERANCE)
+
+    assert parity["max_abs_diff_sense_logits"] <= TOLERANCE
+    assert parity["max_abs_diff_age_logits"] <= TOLERANCE
+    assert parity["same_sense_argmax"] and parity["same_age_argmax"]
+    assert parity["within_tolerance"]
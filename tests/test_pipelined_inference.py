@@ -0,0 +1,87 @@
+import threading
+
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from process_document import AGE_CLASSES, SENSE_CLASSES, DocumentProcessor
+from result_cache import PredictionCache
+
+PARAGRAPHS = [
+    "the sea rose over the dunes",
+    "a city crowd at night",
+    "old swords and older kings",
+    "the forest was quiet",
+    "waves against the harbour wall",
+]
+
+
+class BagOfWordsModel(torch.nn.Module):
+    """Deterministic stand-in for the classifier: logits from mean token embeddings. Counts its forward calls."""
+
+    def __init__(self, vocab_size: int):
+        super().__init__()
+        torch.manual_seed(0)
+        self.sense = torch.nn.Embedding(vocab_size, len(SENSE_CLASSES))
+        self.age = torch.nn.Embedding(vocab_size, len(AGE_CLASSES))
+        self.calls = 0
+
+    def forward(self, input_ids, attention_mask):
+        self.calls += 1
+        mask = attention_mask.unsqueeze(-1).float()
+        return ((self.sense(input_ids) * mask).sum(1) / mask.sum(1),
+                (self.age(input_ids) * mask).sum(1) / mask.sum(1))
+
+
+@pytest.fixture
+def processor(tmp_path, make_fast_tokenizer):
+    # The attributes __init__ sets, without loading a checkpoint
+    processor = DocumentProcessor.__new__(DocumentProcessor)
+    processor.device = torch.device("cpu")
+    processor.tokenizer = make_fast_tokenizer(PARAGRAPHS)
+    processor.model = BagOfWordsModel(len(processor.tokenizer))
+    processor.max_token_len = 16
+    processor.sliding_window = False
+    processor.sense_id_to_name = {v: k for k, v in SENSE_CLASSES.items()}
+    processor.age_id_to_name = {v: k for k, v in AGE_CLASSES.items()}
+    processor.confidence_threshold = 0.0
+    processor.batch_size = 2
+    processor.pipeline_workers = 2
+    processor.queue_depth = 2
+    processor.pipeline_stats = {}
+    processor._thread_state = threading.local()
+    processor.allowed_sense_ids = processor.allowed_age_ids = None
+    processor.cache = PredictionCache(str(tmp_path / "cache.sqlite"), model_identity="test", max_token_len=16)
+    return processor
+
+
+def run_pipelined(processor):
+    return [result for results in processor._iter_pipelined_results(iter(PARAGRAPHS)) for result in results]
+
+
+def test_pipelined_path_on_fully_cached_batches(processor):
+    first = run_pipelined(processor)
+    calls = processor.model.calls
+    assert calls > 0
+
+    # Every paragraph is cached now: no batch has a miss left to tokenize (the fast tokenizer raises on an
+    # empty list) or to run through the model
+    second = run_pipelined(processor)
+    assert processor.model.calls == calls
+    assert second == first
+    assert processor.pipeline_stats["batches"] == 3
+
+
+def test_pipelined_path_on_partially_cached_batches(processor):
+    cache, processor.cache = processor.cache, None
+    reference = run_pipelined(processor)
+    processor.cache = cache
+    # The first batch is fully cached, the second partially
+    processor._predict_batch_with_probabilities(PARAGRAPHS[:3], show_progress=False)
+
+    results = run_pipelined(processor)
+    assert [result["text"] for result in results] == PARAGRAPHS
+    for result, expected in zip(results, reference):
+        for task in ("sense_prediction", "age_prediction"):
+            assert result[task]["class_id"] == expected[task]["class_id"]
+            assert result[task]["confidence"] == pytest.approx(expected[task]["confidence"], abs=1e-6)
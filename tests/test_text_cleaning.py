@@ -0,0 +1,93 @@
+import random
+import re
+
+import pytest
+
+from text_cleaning import clean_text, clean_texts
+
+
+def reference_clean_text(text):
+    """The original multi-pass DataProcessor._clean_text, kept verbatim as the reference."""
+    if not isinstance(text, str):
+        return ""
+    text = text.lower()
+    text = re.sub(r'https?://\S+|www\.\S+', '', text)
+    text = re.sub(r'@\w+|#\w+', '', text)
+    text = re.sub(r'!\[(.*?)\]\(.*?\)', r'\1', text)
+    text = re.sub(r'\[(.*?)\]\(.*?\)', r'\1', text)
+    text = re.sub(r'^\s*#{1,6}\s+', '', text, flags=re.MULTILINE)
+    text = re.sub(r'^\s*>\s+', '', text, flags=re.MULTILINE)
+    text = re.sub(r'^\s*[-\*_]{3,}\s*$', '', text, flags=re.MULTILINE)
+    text = re.sub(r'(\*\*|__|\*|_|~~|`)', '', text)
+    text = re.sub(r'[^\w\s\'-]', '', text)
+    text = re.sub(r'\s+', ' ', text).strip()
+    return text
+
+
+MARKDOWN_FRAGMENTS = [
+    "# ", "## ", "###### ", "####### ", "> ", ">", "---", "***", "___", "- - -", "**", "__", "*", "_", "~~", "~",
+    "`", "```", "[", "]", "(", ")", "![", "](", "[link](http://a.b)", "![alt text](img.png)", "[a](b) [c](d)",
+]
+URL_FRAGMENTS = [
+    "http://example.com", "https://example.com/path?q=1&r=2", "www.example.org", "https://", "http:/x",
+    "@user", "#hashtag", "@", "#", "mail@example.com", "#1", "www.",
+]
+CONTROL_FRAGMENTS = ["\x00", "\x07", "\x1b", "\x1c", "\x1d", "\x1e", "\x1f", "\x7f", "\x85", "\t", "\r", "\v", "\f"]
+UNICODE_WHITESPACE = ["\u00a0", "\u1680", "\u2000", "\u2003", "\u2009", "\u200b", "\u2028", "\u2029",
+                      "\u202f", "\u205f", "\u3000", "\ufeff"]
+WORDS = ["The", "dragon", "City", "don't", "well-known", "naïve", "Straße", "ÉCOLE", "Δράκος", "город", "東京",
+         "café", "İstanbul", "x²", "①", "٣", "emoji🐉", "it's", "--", "'", "-", ".", "!", "?", ",", ";", "..."]
+SEPARATORS = [" ", "  ", "\n", "\n\n", " \n ", ""]
+
+
+def random_text(rng: random.Random, fragments: list[str]) -> str:
+    parts = []
+    for _ in range(rng.randint(0, 40)):
+        parts.append(rng.choice(fragments if rng.random() < 0.5 else WORDS))
+        parts.append(rng.choice(SEPARATORS))
+    return "".join(parts)
+
+
+@pytest.mark.parametrize("fragments", [
+    MARKDOWN_FRAGMENTS, URL_FRAGMENTS, CONTROL_FRAGMENTS, UNICODE_WHITESPACE,
+    MARKDOWN_FRAGMENTS + URL_FRAGMENTS + CONTROL_FRAGMENTS + UNICODE_WHITESPACE,
+], ids=["markdown", "urls", "control", "unicode_whitespace", "mixed"])
+def test_randomized_inputs_match_reference(fragments):
+    rng = random.Random(1234)
+    for _ in range(2000):
+        text = random_text(rng, fragments)
+        assert clean_text(text) == reference_clean_text(text), repr(text)
+
+
+@pytest.mark.parametrize("text", [
+    "", " ", "\n\t  \r\n", " 　", "___", "---\n***\n___", "# heading only", "> quote", "a_b", "snake_case_word",
+    "**bold** and __bold__ and *it* and _it_ and ~~gone~~ and `code`", "[nested [link]](url) ![img](a)(b)",
+    "line one\n# Header\n> quote\n---\nline two", "http://a.com/x_y www.b.c @m_n #h_i",
+    "Plain ASCII prose, with punctuation: done!", "Ünïcödé prose — with dashes – and “quotes”.",
+])
+def test_edge_cases_match_reference(text):
+    assert clean_text(text) == reference_clean_text(text)
+
+
+@pytest.mark.parametrize("value", [None, 1, 1.5, float("nan"), b"bytes", ["a list"]])
+def test_non_str_input_gives_empty_string(value):
+    assert clean_text(value) == reference_clean_text(value) == ""
+
+
+def test_clean_texts_list():
+    rng = random.Random(7)
+    texts = [random_text(rng, MARKDOWN_FRAGMENTS + URL_FRAGMENTS) for _ in range(200)] + [None, ""]
+    cleaned = clean_texts(texts)
+    assert isinstance(cleaned, list)
+    assert cleaned == [reference_clean_text(text) for text in texts]
+
+
+def test_clean_texts_series():
+    pd = pytest.importorskip("pandas")
+    rng = random.Random(11)
+    series = pd.Series([random_text(rng, MARKDOWN_FRAGMENTS + UNICODE_WHITESPACE) for _ in range(100)] + [None],
+                       index=range(1000, 1101))
+    cleaned = clean_texts(series)
+    assert isinstance(cleaned, pd.Series)
+    assert cleaned.index.equals(series.index)
+    assert cleaned.tolist() == [reference_clean_text(text) for text in series]
@@ -0,0 +1,48 @@
+from pathlib import Path
+
+import pytest
+
+transformers = pytest.importorskip("transformers")
+
+# MODEL_NAME of train.py, not imported from there to keep pytorch_lightning out of this test
+MODEL_NAME = "roberta-base"
+MAX_TOKEN_LEN = 128
+SAMPLE_PATH = Path(__file__).parent / "data" / "cleaned_sample.txt"
+
+
+@pytest.fixture(scope="module")
+def tokenizers():
+    try:
+        slow = transformers.RobertaTokenizer.from_pretrained(MODEL_NAME)
+        fast = transformers.RobertaTokenizerFast.from_pretrained(MODEL_NAME)
+    except OSError as e:
+        pytest.skip(f"{MODEL_NAME} tokenizer files are not available: {e}")
+    return slow, fast
+
+
+@pytest.fixture(scope="module")
+def cleaned_texts():
+    # One cleaned text per line; the sample includes an empty text and texts far above MAX_TOKEN_LEN
+    return SAMPLE_PATH.read_text(encoding="utf-8").split("\n")[:-1]
+
+
+@pytest.mark.parametrize("encode_kwargs", [
+    {"max_length": MAX_TOKEN_LEN, "truncation": True, "padding": "max_length"},
+    {"max_length": MAX_TOKEN_LEN, "truncation": True},
+    {"verbose": False},
+], ids=["truncated_padded", "truncated", "untruncated"])
+def test_fast_tokenizer_matches_slow_tokenizer(tokenizers, cleaned_texts, encode_kwargs):
+    slow, fast = tokenizers
+    fast_encodings = fast(cleaned_texts, add_special_tokens=True, return_attention_mask=True, **encode_kwargs)
+    for index, text in enumerate(cleaned_texts):
+        # The previous per-text encode_plus calls are the reference
+        slow_encoding = slow.encode_plus(text, add_special_tokens=True, return_attention_mask=True, **encode_kwargs)
+        assert fast_encodings["input_ids"][index] == slow_encoding["input_ids"], text
+        assert fast_encodings["attention_mask"][index] == slow_encoding["attention_mask"], text
+
+
+def test_sample_covers_truncation(tokenizers, cleaned_texts):
+    _, fast = tokenizers
+    lengths = [len(ids) for ids in fast(cleaned_texts, verbose=False)["input_ids"]]
+    assert max(lengths) > MAX_TOKEN_LEN
+    assert min(lengths) == 2
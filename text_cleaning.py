@@ -0,0 +1,50 @@
+import re
+
+# Patterns of DataProcessor._clean_text, compiled once and applied in the same order.
+_URL_RE = re.compile(r'https?://\S+|www\.\S+')
+_MENTION_HASHTAG_RE = re.compile(r'@\w+|#\w+')
+_MD_IMAGE_RE = re.compile(r'!\[(.*?)\]\(.*?\)')
+_MD_LINK_RE = re.compile(r'\[(.*?)\]\(.*?\)')
+_MD_HEADER_RE = re.compile(r'^\s*#{1,6}\s+', flags=re.MULTILINE)
+_MD_BLOCKQUOTE_RE = re.compile(r'^\s*>\s+', flags=re.MULTILINE)
+_MD_RULE_RE = re.compile(r'^\s*[-\*_]{3,}\s*$', flags=re.MULTILINE)
+# Fusion of the emphasis-marker pass `(\*\*|__|\*|_|~~|`)` and the special-character pass `[^\w\s\'-]`:
+# every marker except `_` is already outside [\w\s'-], and a lone `~` left over by the first pass is
+# removed by the second one anyway, so both passes together delete exactly these characters.
+_SPECIAL_CHARS_RE = re.compile(r"[^\w\s'-]|_")
+# The same deletion for pure-ASCII text as a str.translate table, which is several times faster than re.sub.
+_ASCII_DELETE_TABLE = {code: None for code in range(128) if _SPECIAL_CHARS_RE.match(chr(code))}
+
+# If none of these occur, the URL, mention/hashtag and Markdown passes above cannot match.
+_MARKUP_TRIGGER_RE = re.compile(r'://|www\.|[@#\[>]|[-\*_]{3}')
+
+
+def clean_text(text) -> str:
+    """
+    Single-text cleaning engine behind DataProcessor._clean_text, producing identical output.
+    Plain prose takes a fast path of one trigger search, one character-deletion pass and a whitespace join;
+    pure-ASCII text deletes characters with str.translate instead of a regex.
+    """
+    if not isinstance(text, str):
+        return ""
+    text = text.lower()
+    if _MARKUP_TRIGGER_RE.search(text):
+        text = _URL_RE.sub('', text)
+        text = _MENTION_HASHTAG_RE.sub('', text)
+        text = _MD_IMAGE_RE.sub(r'\1', text)
+        text = _MD_LINK_RE.sub(r'\1', text)
+        text = _MD_HEADER_RE.sub('', text)
+        text = _MD_BLOCKQUOTE_RE.sub('', text)
+        text = _MD_RULE_RE.sub('', text)
+    text = text.translate(_ASCII_DELETE_TABLE) if text.isascii() else _SPECIAL_CHARS_RE.sub('', text)
+    # str.split() and the regex \s agree on what whitespace is, so this equals re.sub(r'\s+', ' ', text).strip()
+    return ' '.join(text.split())
+
+
+def clean_texts(texts):
+    """
+    Batch API: cleans a list (returns a list) or a pandas Series (returns a Series with the same index).
+    """
+    if hasattr(texts, "map"):
+        return texts.map(clean_text)
+    return [clean_text(text) for text in texts]
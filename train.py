@@ -1,6 +1,13 @@
+import math
+import os
+import resource
+import statistics
+import time
+
 import torch
 import pytorch_lightning as pl
-from pytorch_lightning.callbacks import ModelCheckpoint, EarlyStopping
+from pytorch_lightning.callbacks import Callback, ModelCheckpoint, EarlyStopping
+from pytorch_lightning.strategies import DDPStrategy
 import argparse  # Import argparse
 
 from dataset import TextDataModule
@@ -21,18 +28,95 @@ AGE_CLASSES_COUNT = 3
 pl.seed_everything(RANDOM_STATE)
 
 
+class StepStatsCallback(Callback):
+    """
+    Measures the wall time of every training batch (forward, backward and, on accumulation boundaries, the
+    optimizer step) and the peak memory of the run, and prints a summary when training ends. The first
+    `warmup_steps` batches are left out of the timings, since they include torch.compile's compilation.
+    Peak memory is CUDA's max allocated memory on GPU and the peak resident set size of the process on CPU.
+    """
+
+    def __init__(self, mode: dict, warmup_steps: int = 5):
+        self.mode = mode
+        self.warmup_steps = warmup_steps
+        self.step_times = []
+        self._step_start = None
+        self.summary = {}
+
+    def on_train_start(self, trainer, pl_module):
+        if pl_module.device.type == "cuda":
+            torch.cuda.reset_peak_memory_stats(pl_module.device)
+
+    def on_train_batch_start(self, trainer, pl_module, batch, batch_idx):
+        if pl_module.device.type == "cuda":
+            torch.cuda.synchronize(pl_module.device)
+        self._step_start = time.perf_counter()
+
+    def on_train_batch_end(self, trainer, pl_module, outputs, batch, batch_idx):
+        if pl_module.device.type == "cuda":
+            torch.cuda.synchronize(pl_module.device)
+        self.step_times.append(time.perf_counter() - self._step_start)
+
+    @staticmethod
+    def peak_memory_mb(device: torch.device) -> float:
+        if device.type == "cuda":
+            return torch.cuda.max_memory_allocated(device) / 2 ** 20
+        # ru_maxrss is in kilobytes on Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+    def on_train_end(self, trainer, pl_module):
+        timed = self.step_times[self.warmup_steps:] or self.step_times
+        if not timed:
+            return
+        timed_ms = sorted(step_time * 1000 for step_time in timed)
+        accumulate = trainer.accumulate_grad_batches
+        self.summary = {
+            **self.mode,
+            "timed_batches": len(timed_ms),
+            "mean_batch_ms": statistics.mean(timed_ms),
+            "p95_batch_ms": timed_ms[int(0.95 * (len(timed_ms) - 1))],
+            "mean_optimizer_step_ms": statistics.mean(timed_ms) * accumulate,
+            "peak_memory_mb": self.peak_memory_mb(pl_module.device),
+        }
+        print(f"Training step stats: {self.summary}")
+
+
+def compile_model(model: RoBERTaMultiTaskClassifier, dynamic: bool):
+    """
+    Compiles the encoder and both heads in place with nn.Module.compile. Unlike wrapping them in
+    torch.compile(...), parameter names keep no '_orig_mod.' prefix, so checkpoints stay loadable without it.
+    With dynamic padding every batch has its own sequence length, so shapes are compiled as dynamic.
+    """
+    for module in (model.roberta, model.sense_classifier, model.age_classifier):
+        module.compile(dynamic=dynamic)
+
+
 def main(args):
     """Main function to run the training pipeline."""
     torch.set_float32_matmul_precision('high')
+    world_size = args.devices * args.num_nodes
+    if args.threads_per_process:
+        torch.set_num_threads(args.threads_per_process)
+    elif world_size > 1 and not torch.cuda.is_available():
+        # Every process of this node runs main(): split the cores between them instead of oversubscribing
+        torch.set_num_threads(max(1, (os.cpu_count() or 1) // args.devices))
+    precision = args.precision
+    if precision == "auto":
+        precision = "16-mixed" if torch.cuda.is_available() else "bf16-mixed"
     CLEANED_DATA_PATH = args.dataset_path
     print("Initializing DataModule...")
     data_module = TextDataModule(
         data_path=CLEANED_DATA_PATH, batch_size=BATCH_SIZE, max_token_len=MAX_TOKEN_COUNT,
-        model_name=MODEL_NAME, random_state=RANDOM_STATE
+        model_name=MODEL_NAME, random_state=RANDOM_STATE, pretokenized_dir=args.pretokenized_dir,
+        dynamic_padding=args.dynamic_padding, group_by_length=args.group_by_length, num_workers=args.num_workers
     )
+    # Shards missing from pretokenized_dir are written by the Trainer, once, in data_module.prepare_data;
+    # until then setup() splits the CSV, which gives the same batch counts
     data_module.setup()
 
-    steps_per_epoch = len(data_module.train_dataloader())
+    # The scheduler steps once per optimizer step: once every accumulate_grad_batches batches of one process,
+    # and every process only runs its own shard of the training batches
+    steps_per_epoch = math.ceil(data_module.train_batches_per_process(world_size) / args.accumulate_grad_batches)
     total_training_steps = steps_per_epoch * N_EPOCHS
     warmup_steps = int(total_training_steps * 0.1)
 
@@ -42,17 +126,33 @@ def main(args):
         learning_rate=LEARNING_RATE, n_training_steps=total_training_steps,
         n_warmup_steps=warmup_steps, max_token_len=MAX_TOKEN_COUNT
     )
+    if args.compile:
+        compile_model(model, dynamic=data_module.dynamic_padding)
 
     checkpoint_callback = ModelCheckpoint(
         dirpath="checkpoints", filename="best-checkpoint-{epoch:02d}-{val_loss:.2f}",
         save_top_k=1, verbose=True, monitor="val_loss", mode="min"
     )
     early_stopping_callback = EarlyStopping(monitor='val_loss', patience=PATIENCE, verbose=True)
+    effective_batch_size = BATCH_SIZE * args.accumulate_grad_batches * world_size
+    step_stats_callback = StepStatsCallback(mode={
+        "precision": precision, "compile": args.compile, "accumulate_grad_batches": args.accumulate_grad_batches,
+        "world_size": world_size, "effective_batch_size": effective_batch_size,
+    })
 
-    print("Initializing Trainer...")
+    strategy = "auto"
+    if world_size > 1:
+        strategy = DDPStrategy(process_group_backend=args.ddp_backend
+                               or ("nccl" if torch.cuda.is_available() else "gloo"))
+    print(f"Initializing Trainer ({precision} precision, {world_size} process(es), effective batch size "
+          f"{effective_batch_size})...")
     trainer = pl.Trainer(
-        callbacks=[checkpoint_callback, early_stopping_callback], max_epochs=N_EPOCHS,
-        accelerator="gpu" if torch.cuda.is_available() else "cpu", devices=1, log_every_n_steps=10
+        callbacks=[checkpoint_callback, early_stopping_callback, step_stats_callback], max_epochs=N_EPOCHS,
+        accelerator="gpu" if torch.cuda.is_available() else "cpu", devices=args.devices, num_nodes=args.num_nodes,
+        strategy=strategy, log_every_n_steps=10, precision=precision,
+        accumulate_grad_batches=args.accumulate_grad_batches,
+        # TextDataModule shards its dataloaders itself (see TextDataModule._build_dataloader)
+        use_distributed_sampler=False
     )
 
     if not args.test_only:
@@ -82,10 +182,83 @@ if __name__ == '__main__':
         default=None,
         help='Path to a specific .csv file to resume training on this dataset.'
     )
+    parser.add_argument(
+        '--pretokenized_dir',
+        type=str,
+        default=None,
+        help='Directory of memory-mapped token shards; created from the dataset on first use.'
+    )
+    parser.add_argument(
+        '--dynamic_padding',
+        action="store_true",
+        help='Pad each batch to its longest sequence instead of the max token count.'
+    )
+    parser.add_argument(
+        '--group_by_length',
+        action="store_true",
+        help='Batch samples of similar length together (implies --dynamic_padding).'
+    )
+    parser.add_argument(
+        '--precision',
+        type=str,
+        choices=["32-true", "bf16-mixed", "16-mixed", "auto"],
+        default="32-true",
+        help='Training precision; auto picks 16-mixed on GPU and bf16-mixed on CPU.'
+    )
+    parser.add_argument(
+        '--compile',
+        action="store_true",
+        help='Compile the RoBERTa encoder and both heads with torch.compile.'
+    )
+    parser.add_argument(
+        '--accumulate_grad_batches',
+        type=int,
+        default=1,
+        help=f'Batches of {BATCH_SIZE} whose gradients are accumulated before each optimizer step.'
+    )
+    parser.add_argument(
+        '--devices',
+        type=int,
+        default=1,
+        help='Training processes per node (GPUs, or CPU processes); above 1 (or with --num_nodes) trains with DDP.'
+    )
+    parser.add_argument(
+        '--num_nodes',
+        type=int,
+        default=1,
+        help='Machines taking part; each is started with the same command plus MASTER_ADDR, MASTER_PORT and NODE_RANK.'
+    )
+    parser.add_argument(
+        '--ddp_backend',
+        type=str,
+        choices=["gloo", "nccl"],
+        default=None,
+        help='Process group backend for DDP (default: gloo on CPU, nccl on GPU).'
+    )
+    parser.add_argument(
+        '--threads_per_process',
+        type=int,
+        default=None,
+        help='torch threads per training process (default on CPU DDP: CPU count divided by --devices).'
+    )
+    parser.add_argument(
+        '--num_workers',
+        type=int,
+        default=4,
+        help='DataLoader worker processes per training process.'
+    )
     parser.add_argument(
         '--test_only',
         action="store_true",
         help='Set to avoid training steps and leads to direct test.'
     )
     args = parser.parse_args()
+    if args.accumulate_grad_batches < 1:
+        parser.error("--accumulate_grad_batches must be at least 1.")
+    if args.devices < 1 or args.num_nodes < 1:
+        parser.error("--devices and --num_nodes must be at least 1.")
+    if args.ddp_backend == "nccl" and not torch.cuda.is_available():
+        parser.error("The nccl backend needs GPUs; use gloo on CPU.")
+    if args.precision == "16-mixed" and not torch.cuda.is_available():
+        parser.error("16-mixed precision needs a GPU; use bf16-mixed on CPU.")
     main(args)